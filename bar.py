@@ -2,48 +2,187 @@
 
 import sys
 import asyncio
+import inspect
 
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
 from shutil import which
-from widgets import Widget, Button
+from typing import Optional
+from widgets import Widget, Button, fold
+from engine import Engine
+from output import Output, LogSink
+from timers import wheel
 
-import config
+import metrics
+import policies
+import sysstat
+import tracing
 
 
-async def print_bar(bar: Widget, bar_in: asyncio.StreamWriter):
+async def print_bar(bar: Widget, output: Output):
     async for value in bar:
-        bar_in.write(value.encode())
-        await bar_in.drain()
-        print(value, flush=True, file=sys.stderr)
+        output.push(value)
 
 
-async def process_input(bar_out: asyncio.StreamReader):
+async def dispatch(
+    id: int,
+    callback: Callable[[None], None],
+    executor: Executor,
+    trace: Optional[tracing.Trace]=None,
+    blocking: bool=False
+):
+    tracing.current.set(trace)
+    try:
+        if blocking:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, callback)
+        else:
+            result = callback()
+
+        if inspect.isawaitable(result):
+            await result
+    finally:
+        policies.urgent(id)
+        if trace is not None:
+            trace.mark("callback")
+
+
+def report_click(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"click callback failed: {task.exception()!r}", file=sys.stderr)
+
+
+def report_metrics(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"metrics server failed: {task.exception()!r}", file=sys.stderr)
+
+
+async def process_input(bar_out: asyncio.StreamReader, executor: Executor):
+    clicks: set[asyncio.Task] = set()
+    arrivals = tracing.watch(bar_out)
+
     while True:
         line = await bar_out.readline()
-        id = int(line.strip().decode())
-
-        Button.callbacks[id]()
+        if not line:
+            break
+        trace = tracing.begin(arrivals)
+
+        try:
+            id = int(line.strip().decode())
+            callback = Button.callbacks[id]
+        except (UnicodeDecodeError, ValueError, KeyError):
+            print(f"ignoring click {line!r}", file=sys.stderr)
+            continue
+
+        if trace is not None:
+            trace.parsed(id)
+        task = asyncio.create_task(dispatch(
+            id, callback, executor, trace, Button.callbacks.blocking(id)))
+        clicks.add(task)
+        task.add_done_callback(clicks.discard)
+        task.add_done_callback(report_click)
+
+
+async def run(
+    bars: list[tuple[Widget, list[list[str]]]],
+    max_fps: float=0.0,
+    min_interval: float=0.0,
+    log: Optional[LogSink]=None,
+    click_workers: int=2
+) -> int:
+    executor = ThreadPoolExecutor(click_workers)
+    lemonbars: list[asyncio.subprocess.Process] = []
+    tasks: list[asyncio.Task] = []
+
+    metrics.register("callbacks", lambda: {"ids": len(Button.callbacks)})
+    metrics.register("timers", lambda: {"wakeups": wheel.wakeups})
+    metrics.register("samplers", sysstat.samplers)
+
+    try:
+        for index, (bar, commands) in enumerate(bars):
+            group = [
+                await asyncio.subprocess.create_subprocess_exec(
+                    *command,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE)
+                for command in commands
+            ]
+            lemonbars.extend(group)
+
+            output = Output([lemonbar.stdin for lemonbar in group],
+                            max_fps, min_interval, log)
+            metrics.register(f"output{index}", output.counters)
+
+            tasks.append(asyncio.create_task(print_bar(bar, output)))
+            tasks.append(asyncio.create_task(output.run()))
+
+        for lemonbar in lemonbars:
+            tasks.append(asyncio.create_task(
+                process_input(lemonbar.stdout, executor)))
+
+        done, _ = await asyncio.wait(tasks,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        for lemonbar in lemonbars:
+            lemonbar.stdin.close()
+        executor.shutdown(wait=False)
+        returncodes = [await lemonbar.wait() for lemonbar in lemonbars]
+
+    return max(returncodes, default=0)
 
 
 async def main() -> int:
-    fonts = []
-    for font in config.fonts:
-        fonts.extend(("-f", font))
+    import config
 
     lemonbar_path = which("lemonbar")
     if lemonbar_path is None:
         print("lemonbar isn't found!", file=sys.stderr)
         return 1
 
-    lemonbar = await asyncio.subprocess.create_subprocess_exec(
-        lemonbar_path,
-        "-g", "1920x30+0+0", *fonts,
-        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
-
-    input_task = asyncio.create_task(print_bar(config.bar, lemonbar.stdin))
-    output_task = asyncio.create_task(process_input(lemonbar.stdout))
-
-    await asyncio.gather(input_task, output_task)
-    await lemonbar.wait()
+    roots: list[Widget] = []
+    commands: list[list[list[str]]] = []
+    for monitor in config.monitors:
+        fonts = []
+        for font in monitor.fonts or config.fonts:
+            fonts.extend(("-f", font))
+        command = [lemonbar_path, "-g", monitor.geometry, *fonts]
+
+        root = monitor.bar if monitor.bar is not None else config.bar
+        for index, other in enumerate(roots):
+            if other is root:
+                commands[index].append(command)
+                break
+        else:
+            roots.append(root)
+            commands.append([command])
+
+    bars = []
+    for root, group in zip(roots, commands):
+        bar, folded = fold(root)
+        print(f"folded {folded.nodes} static nodes, {folded.tasks} tasks",
+              file=sys.stderr)
+        if config.reactive:
+            bar = Engine(bar)
+        bars.append((bar, group))
+
+    log = LogSink() if config.log_frames else None
+
+    wheel.max_sleep = config.timer_poll
+
+    if config.trace_file is not None:
+        tracing.enable(config.trace_file)
+
+    if config.metrics:
+        metrics.enable()
+        server = asyncio.create_task(metrics.serve(config.metrics_socket))
+        server.add_done_callback(report_metrics)
+
+    await run(bars, config.max_fps, config.min_interval, log,
+              config.click_workers)
 
     return 0
 
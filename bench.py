@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import asyncio
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+from collections.abc import AsyncIterator
+from contextlib import suppress
+from widgets import (
+    Widget,
+    Box,
+    Text,
+    Button,
+    FColor,
+    BColor,
+    UColor,
+    Font,
+    Slot,
+    Template,
+    Threaded,
+)
+from engine import Engine
+
+import bar
+import sysstat
+
+FAKEBAR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       "fakebar.py")
+BACKENDS = ("sdbus", "pulsectl_asyncio")
+
+STARTUP = """
+import sys
+import time
+
+start = time.monotonic_ns()
+import asyncio
+import bar
+from widgets import Box, Clock, FColor, Text
+imported = time.monotonic_ns()
+print(start, imported, *(name for name in {backends!r} if name in sys.modules),
+      flush=True)
+
+root = Box([FColor(Text("startup"), "#ffffff"), Clock()], " ")
+commands = [[sys.executable, {fakebar!r}, "--report", {report!r}]]
+asyncio.run(bar.run([(root, commands)], 0.0))
+"""
+
+
+class Pulse(Widget):
+    def __init__(self, value: str):
+        self._value = value
+        self._event = asyncio.Event()
+
+    def poke(self):
+        self._event.set()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            yield self._value
+            await self._event.wait()
+            self._event.clear()
+
+
+class Ticker(Widget):
+    def __init__(self, rate: float, rng: random.Random):
+        self._rate = rate
+        self._rng = rng
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            yield f"@{time.monotonic_ns()}"
+            await asyncio.sleep(self._rng.uniform(0.5, 1.5) / self._rate)
+
+
+class Blocking(Widget):
+    def __init__(self, producer, period: float):
+        self._producer = producer
+        self._period = period
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            yield self._producer()
+            await asyncio.sleep(self._period)
+
+
+def build(depth: int, width: int, rate: float, rng: random.Random) -> Widget:
+    if depth == 0:
+        return Ticker(rate, rng)
+    return FColor(Box([build(depth - 1, width, rate, rng)
+                       for _ in range(width)], ' '), "#ffffff")
+
+
+def resident() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentile(values: list[int], p: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def tree(
+    depth: int,
+    width: int,
+    rate: float,
+    engine: str,
+    duration: float,
+    max_fps: float,
+    click_rate: float,
+    monitors: int,
+    seed: int
+):
+    rng = random.Random(seed)
+    clicks = 0
+
+    def click():
+        nonlocal clicks
+        clicks += 1
+
+    button = Button(Text("click"), click)
+    root: Widget = Box([button, build(depth, width, rate, rng)], ' ')
+    if engine == "reactive":
+        root = Engine(root)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = [os.path.join(tmp, f"report{i}") for i in range(monitors)]
+        commands = []
+        for i, report in enumerate(reports):
+            command = [sys.executable, FAKEBAR,
+                       "-g", f"1920x30+{1920 * i}+0", "--report", report]
+            if click_rate > 0:
+                command += ["--click", str(button._id),
+                            "--click-rate", str(click_rate)]
+            commands.append(command)
+
+        task = asyncio.create_task(bar.run([(root, commands)], max_fps))
+        await asyncio.sleep(duration)
+        tasks = len(asyncio.all_tasks())
+        rss = resident()
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+        received = []
+        for report in reports:
+            with open(report) as file:
+                received.append([tuple(map(int, line.split()))
+                                 for line in file])
+    frames = received[0]
+
+    latencies = sorted(recv - stamp for recv, stamp in frames if stamp)
+    span = (frames[-1][0] - frames[0][0]) / 1e9 if len(frames) > 1 else 0.0
+
+    print(f"engine:      {engine}")
+    print(f"leaves:      {width ** depth} at {rate:g} Hz")
+    print(f"frames:      {' '.join(str(len(r)) for r in received)}")
+    print(f"fps:         {len(frames) / span if span else 0.0:.1f}")
+    for p in (0.5, 0.9, 0.99):
+        print(f"latency p{int(p * 100):<3d} "
+              f"{percentile(latencies, p) / 1e3:.0f} us")
+    print(f"tasks:       {tasks}")
+    print(f"rss:         {rss / 1024:.0f} KiB")
+    print(f"clicks:      {clicks}")
+
+
+async def templates(iterations: int):
+    template = Template(
+        FColor(Box([Box([Font(Text(Slot("icon")), "2"), Font()]),
+                    Text(Slot("percentage"))], ' '), Slot("color")),
+        percentage=lambda value: f"{value}%")
+
+    def shape(percentage: int) -> Widget:
+        return FColor(Box([Box([Font(Text('\uf240'), "2"), Font()]),
+                           Text(f"{percentage}%")], ' '), "#25e817")
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        await anext(aiter(shape(i % 100)))
+    trees = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        template.fill(icon='\uf240', percentage=i % 100, color="#25e817")
+    filled = time.perf_counter() - start
+
+    print(f"tree:     {trees / iterations * 1e6:8.2f} us/update")
+    print(f"template: {filled / iterations * 1e6:8.2f} us/update")
+
+
+async def churn(width: int, rounds: int, ops: int, seed: int):
+    rng = random.Random(seed)
+    box = Box([Box([Pulse(str(i)), FColor()]) for i in range(width)], ' ')
+    frames = 0
+
+    async def consume():
+        nonlocal frames
+        async for _ in box:
+            frames += 1
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+
+    tracemalloc.start()
+    print("round   mem KiB   us/op   tasks  frames")
+    for round in range(rounds):
+        start = time.perf_counter()
+        for op in range(ops):
+            choice = rng.randrange(5)
+            index = rng.randrange(len(box))
+            if choice == 0:
+                box[index] = Box([Pulse(str(op)), FColor()])
+            elif choice == 1:
+                box.insert(index, Box([Pulse(str(op)), FColor()]))
+                box.pop(rng.randrange(len(box)))
+            elif choice == 2:
+                box.remove(box[index])
+                box.append(Box([Pulse(str(op)), FColor()]))
+            elif choice == 3:
+                del box[index]
+                box.append(Text(str(op)))
+            else:
+                child = box[index]
+                if isinstance(child, Box):
+                    child[0].poke()
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+
+        await asyncio.sleep(0.05)
+        current, _ = tracemalloc.get_traced_memory()
+        print(f"{round:5d} {current / 1024:9.1f} {elapsed / ops * 1e6:7.1f}"
+              f" {len(asyncio.all_tasks()):7d} {frames:7d}")
+    tracemalloc.stop()
+
+    consumer.cancel()
+
+
+def naive(kind: str) -> object:
+    if kind == "cpu":
+        with open("/proc/stat") as stat:
+            fields = [int(field) for field in stat.readline().split()[1:9]]
+        return sum(fields) - fields[3] - fields[4], sum(fields)
+    if kind == "memory":
+        with open("/proc/meminfo") as meminfo:
+            info = dict(line.split(":", 1) for line in meminfo)
+        return (int(info["MemTotal"].split()[0]),
+                int(info["MemAvailable"].split()[0]))
+    with open("/proc/loadavg") as loadavg:
+        return tuple(float(field) for field in loadavg.read().split()[:3])
+
+
+def samplers(iterations: int):
+    print("kind       naive us   sampler us")
+    for kind in sysstat.PARSERS:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            naive(kind)
+        naive_us = (time.perf_counter() - start) / iterations * 1e6
+
+        sampler = sysstat.Sampler(*sysstat.PARSERS[kind])
+        sampler._source = sysstat.Source(sampler.path)
+        for _ in range(iterations):
+            sampler.sample()
+        sampler._source.close()
+
+        print(f"{kind:8s} {naive_us:10.1f} {sampler.stats()['tick_us']:12.1f}")
+
+
+async def producers(count: int, cost: float, duration: float, inline: bool):
+    def producer() -> str:
+        time.sleep(cost)
+        return f"{time.monotonic():.0f}"
+
+    if inline:
+        children = [Blocking(producer, 1.0) for _ in range(count)]
+    else:
+        children = [Threaded(producer, 1.0) for _ in range(count)]
+    box = Box(children, ' ')
+    frames = 0
+
+    async def consume():
+        nonlocal frames
+        async for _ in box:
+            frames += 1
+
+    consumer = asyncio.create_task(consume())
+    lags = []
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        start = time.monotonic()
+        await asyncio.sleep(0.01)
+        lags.append(int((time.monotonic() - start - 0.01) * 1e6))
+    consumer.cancel()
+    with suppress(asyncio.CancelledError):
+        await consumer
+
+    lags.sort()
+    print(f"producers:   {count} x {cost * 1e3:.0f} ms "
+          f"{'inline' if inline else 'threaded'}")
+    print(f"frames:      {frames}")
+    for p in (0.5, 0.99):
+        print(f"loop lag p{int(p * 100):<3d}"
+              f"{percentile(lags, p) / 1e3:.1f} ms")
+    print(f"loop lag max {lags[-1] / 1e3:.1f} ms")
+
+
+def layout(monitors: int, tags: int) -> Widget:
+    return Box([
+        Box([
+            Button(Box([
+                BColor(FColor(UColor(Text(f" {tag} "), "#1693d2"),
+                              "#aaaaaa"), "#1b1b1b"),
+                BColor(), FColor()
+            ]), Slot(str(tag)))
+            for tag in range(tags)
+        ], '')
+        for _ in range(monitors)
+    ], ' ')
+
+
+def memory(monitors: int, tags: int):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    root = layout(monitors, tags)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = monitors * (tags * 9 + 1) + 1
+    print(f"nodes:       {nodes}")
+    print(f"memory:      {(after - before) / 1024:.1f} KiB")
+    print(f"per node:    {(after - before) / nodes:.0f} B")
+    del root
+
+
+async def startup(runs: int):
+    spawn, imports, first = [], [], []
+    loaded: set[str] = set()
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = os.path.join(tmp, "report")
+            code = STARTUP.format(backends=BACKENDS, fakebar=FAKEBAR,
+                                  report=report)
+            spawned = time.monotonic_ns()
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", code, stdout=asyncio.subprocess.PIPE,
+                cwd=os.path.dirname(FAKEBAR))
+            fields = (await process.stdout.readline()).split()
+            if not fields:
+                raise RuntimeError("bar exited before importing")
+            start, imported, *names = fields
+            loaded.update(name.decode() for name in names)
+
+            line = ""
+            deadline = time.monotonic() + 10.0
+            while not line and time.monotonic() < deadline:
+                await asyncio.sleep(0.001)
+                with suppress(FileNotFoundError), open(report) as file:
+                    line = file.readline()
+            process.terminate()
+            await process.wait()
+
+        spawn.append(int(start) - spawned)
+        imports.append(int(imported) - int(start))
+        if line:
+            first.append(int(line.split()[0]) - spawned)
+
+    for name, values in (("interpreter", spawn), ("imports", imports),
+                         ("first frame", first)):
+        values.sort()
+        print(f"{name + ':':12s} {percentile(values, 0.5) / 1e6:7.1f} ms")
+    print(f"backends:    {' '.join(sorted(loaded)) or 'none'}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("churn")
+    command.add_argument("--width", type=int, default=20)
+    command.add_argument("--rounds", type=int, default=10)
+    command.add_argument("--ops", type=int, default=2000)
+    command.add_argument("--seed", type=int, default=0)
+
+    command = commands.add_parser("tree")
+    command.add_argument("--depth", type=int, default=2)
+    command.add_argument("--width", type=int, default=4)
+    command.add_argument("--rate", type=float, default=2.0)
+    command.add_argument("--engine", choices=("box", "reactive"),
+                         default="box")
+    command.add_argument("--duration", type=float, default=5.0)
+    command.add_argument("--max-fps", type=float, default=0.0)
+    command.add_argument("--click-rate", type=float, default=0.0)
+    command.add_argument("--monitors", type=int, default=1)
+    command.add_argument("--seed", type=int, default=0)
+
+    command = commands.add_parser("templates")
+    command.add_argument("--iterations", type=int, default=2000)
+
+    command = commands.add_parser("samplers")
+    command.add_argument("--iterations", type=int, default=5000)
+
+    command = commands.add_parser("producers")
+    command.add_argument("--count", type=int, default=4)
+    command.add_argument("--cost", type=float, default=0.3)
+    command.add_argument("--duration", type=float, default=5.0)
+    command.add_argument("--inline", action="store_true")
+
+    command = commands.add_parser("memory")
+    command.add_argument("--monitors", type=int, default=3)
+    command.add_argument("--tags", type=int, default=300)
+
+    command = commands.add_parser("startup")
+    command.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == "churn":
+        asyncio.run(churn(args.width, args.rounds, args.ops, args.seed))
+    elif args.command == "tree":
+        asyncio.run(tree(args.depth, args.width, args.rate, args.engine,
+                         args.duration, args.max_fps, args.click_rate,
+                         args.monitors, args.seed))
+    elif args.command == "templates":
+        asyncio.run(templates(args.iterations))
+    elif args.command == "samplers":
+        samplers(args.iterations)
+    elif args.command == "startup":
+        asyncio.run(startup(args.runs))
+    elif args.command == "memory":
+        memory(args.monitors, args.tags)
+    elif args.command == "producers":
+        asyncio.run(producers(args.count, args.cost, args.duration,
+                              args.inline))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,16 @@
-import re
+import herbstluft
 
-from subprocess import run
+from functools import partial
 from os.path import expanduser
 from widgets import *
+from output import Monitor
 
-def spawn(program, *args):
-    run(["herbstclient", "spawn", program, *args], shell=False)
+async def spawn(program, *args):
+    await herbstluft.client.command("spawn", program, *args)
 
 # ---------------------------------------------------
 
-def ip_addr():
-    out = run(["ip", "a"],
-              shell=False,
-              capture_output=True,
-              text=True).stdout
-
-    ip = re.search("wlp1s0.*inet (\\d+.\\d+.\\d+.\\d+)/", out, re.DOTALL)
-
-    return ip.group(1)
-
-ip = Box([FColor(Text(ip_addr()), "#c9a00e"), FColor()])
+ip = Network("wlp1s0")
 
 # ---------------------------------------------------
 
@@ -29,9 +20,9 @@ logo = Button(Offset(Box([
             Text('\uf303'), "4"),
         "#1693d2"),
     FColor()
-], ''), "4"), lambda: spawn(expanduser("~/.local/bin/menu.sh")))
+], ''), "4"), partial(spawn, expanduser("~/.local/bin/menu.sh")))
 
-left_box = Box([logo], ' ')
+left_box = Box([logo, Tags()], ' ')
 
 # ---------------------------------------------------
 
@@ -39,13 +30,26 @@ clock = Clock()
 
 right_box = Box([
     ip,
-    Volume(lambda: spawn("pavucontrol"), 2),
+    Volume(partial(spawn, "pavucontrol"), 2),
     BatteryBox(2),
-    Button(clock, lambda: clock.toggle())
+    Button(clock, clock.toggle)
 ], ' | ')
 
 # ---------------------------------------------------
 
+reactive = True
+
+max_fps = 30
+min_interval = 0.0
+log_frames = False
+click_workers = 2
+
+metrics = False
+metrics_socket = expanduser("~/.cache/pybar.sock")
+trace_file = None
+# seconds between forced wall clock checks; None relies on the timerfd
+timer_poll = None
+
 fonts = [
     "Galmuri7-12",
     "Font Awesome 6 Free Solid-12",
@@ -57,3 +61,7 @@ bar = Box([
     AlignLeft(left_box),
     AlignRight(right_box)
 ], '')
+
+monitors = [
+    Monitor("1920x30+0+0")
+]
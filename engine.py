@@ -0,0 +1,215 @@
+import asyncio
+
+from collections.abc import AsyncIterator
+from typing import Optional
+
+from widgets import Widget, Box, Text, Static, Wrapper, Button
+
+import policies
+
+
+class Node:
+    def __init__(self, engine: "Engine", parent: Optional["Node"]):
+        self._engine = engine
+        self._parent = parent
+        self._value: Optional[str] = None
+        self._dirty: bool = True
+
+    def invalidate(self, wake: bool=True):
+        node = self
+        while node is not None and not node._dirty:
+            node._dirty = True
+            node = node._parent
+        if wake:
+            self._engine.wake()
+
+    def render(self) -> Optional[str]:
+        if self._dirty:
+            self._value = self._compose()
+            self._dirty = False
+        return self._value
+
+    def _compose(self) -> Optional[str]:
+        return self._value
+
+    def detach(self):
+        pass
+
+    def _scope(self) -> tuple[int, ...]:
+        ids = []
+        node = self._parent
+        while node is not None:
+            if (isinstance(node, WrapperNode)
+                    and isinstance(node._wrapper, Button)
+                    and isinstance(node._wrapper._id, int)):
+                ids.append(node._wrapper._id)
+            node = node._parent
+        return tuple(reversed(ids))
+
+
+class ConstNode(Node):
+    def __init__(self, engine: "Engine", parent: Optional[Node], value: str):
+        super().__init__(engine, parent)
+        self._value = value
+
+
+class LeafNode(Node):
+    def __init__(
+        self,
+        engine: "Engine",
+        parent: Optional[Node],
+        widget: Widget
+    ):
+        super().__init__(engine, parent)
+        self._gate: Optional[policies.Gate] = None
+        if widget.policy is not None:
+            self._gate = policies.Gate(widget.policy, self._store,
+                                       self._engine.wake, self._scope())
+        self._task = engine.spawn(self._pump(widget))
+
+    def _store(self, value: str):
+        self._value = value
+        self.invalidate(wake=False)
+
+    async def _pump(self, widget: Widget):
+        async for value in widget:
+            if self._gate is None:
+                self._value = value
+                self.invalidate()
+            else:
+                self._gate.push(value)
+
+    def detach(self):
+        self._task.cancel()
+        if self._gate is not None:
+            self._gate.close()
+
+
+class WrapperNode(Node):
+    def __init__(
+        self,
+        engine: "Engine",
+        parent: Optional[Node],
+        widget: Wrapper
+    ):
+        super().__init__(engine, parent)
+        self._wrapper = widget
+        self._format = widget._format
+        self._child = engine.build(widget.child, self)
+        widget.watch(self._sync)
+
+    def _sync(self):
+        self._child.detach()
+        self._child = self._engine.build(self._wrapper.child, self)
+        self.invalidate()
+
+    def _compose(self) -> Optional[str]:
+        value = self._child.render()
+        if value is None:
+            return None
+        return self._format(value)
+
+    def detach(self):
+        self._wrapper.unwatch(self._sync)
+        self._child.detach()
+
+
+class BoxNode(Node):
+    def __init__(
+        self,
+        engine: "Engine",
+        parent: Optional[Node],
+        box: Box
+    ):
+        super().__init__(engine, parent)
+        self._box = box
+        self._children: dict[object, Node] = {
+            key: engine.build(widget, self)
+            for key, widget in zip(box._keys, box)
+        }
+        box.watch(self._sync)
+
+    def _sync(self):
+        children = {}
+        for key, widget in zip(self._box._keys, self._box):
+            node = self._children.pop(key, None)
+            if node is None:
+                node = self._engine.build(widget, self)
+            children[key] = node
+
+        for node in self._children.values():
+            node.detach()
+
+        self._children = children
+        self.invalidate()
+
+    def _compose(self) -> Optional[str]:
+        if not self._children:
+            return None
+        values = [node.render() for node in self._children.values()]
+        if None in values:
+            return None
+        return self._box._sep.join(values)
+
+    def detach(self):
+        self._box.unwatch(self._sync)
+        for node in self._children.values():
+            node.detach()
+
+
+class Engine(Widget):
+    def __init__(self, root: Widget):
+        self._root = root
+        self._tasks: set[asyncio.Task] = set()
+        self._event: Optional[asyncio.Event] = None
+        self._error: Optional[BaseException] = None
+
+    @property
+    def tasks(self) -> int:
+        return len(self._tasks)
+
+    def build(self, widget: Widget, parent: Optional[Node]) -> Node:
+        if isinstance(widget, (Text, Static)):
+            return ConstNode(self, parent, widget.static())
+        if widget.policy is not None:
+            return LeafNode(self, parent, widget)
+        if isinstance(widget, Box):
+            return BoxNode(self, parent, widget)
+        if isinstance(widget, Wrapper):
+            return WrapperNode(self, parent, widget)
+        return LeafNode(self, parent, widget)
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._reap)
+        return task
+
+    def wake(self):
+        if self._event is not None:
+            self._event.set()
+
+    def _reap(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._error = task.exception()
+            self.wake()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self._event = asyncio.Event()
+        root = self.build(self._root, None)
+        root.invalidate()
+        try:
+            while True:
+                await self._event.wait()
+                self._event.clear()
+                if self._error is not None:
+                    raise self._error
+                value = root.render()
+                if value is not None:
+                    yield value
+        finally:
+            root.detach()
+            for task in list(self._tasks):
+                task.cancel()
+            self._event = None
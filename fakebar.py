@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+import time
+import argparse
+import threading
+
+STAMP = re.compile(rb"@(\d+)")
+
+
+def click(ids: list[str], rate: float, stop: threading.Event):
+    index = 0
+    while not stop.wait(1.0 / rate):
+        sys.stdout.write(ids[index % len(ids)] + "\n")
+        sys.stdout.flush()
+        index += 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--report", required=True)
+    parser.add_argument("--click", action="append", default=[])
+    parser.add_argument("--click-rate", type=float, default=1.0)
+    args, _ = parser.parse_known_args()
+
+    stop = threading.Event()
+    if args.click:
+        threading.Thread(target=click,
+                         args=(args.click, args.click_rate, stop),
+                         daemon=True).start()
+
+    with open(args.report, "w", buffering=1) as report:
+        for line in sys.stdin.buffer:
+            now = time.monotonic_ns()
+            stamps = [int(stamp) for stamp in STAMP.findall(line)]
+            report.write(f"{now} {max(stamps, default=0)}\n")
+
+    stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+
+STATE = os.environ.get("FAKEHLWM", ".fakehlwm")
+
+
+def path(name: str) -> str:
+    return os.path.join(STATE, name)
+
+
+def hook(*args: str):
+    with open(path("hooks"), "a") as hooks:
+        hooks.write("\t".join(args) + "\n")
+
+
+def idle() -> int:
+    with open(path("hooks"), "a+") as hooks:
+        hooks.seek(0, os.SEEK_END)
+        while True:
+            line = hooks.readline()
+            if not line:
+                time.sleep(0.02)
+                continue
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+
+def use(name: str):
+    with open(path("tags")) as file:
+        tags = [field for field in file.read().strip("\t\n").split("\t")]
+    tags = [(":" if state == "#" else state) + tag
+            for state, tag in ((field[0], field[1:]) for field in tags)]
+    tags = ["#" + field[1:] if field[1:] == name else field for field in tags]
+    with open(path("tags"), "w") as file:
+        file.write("\t" + "\t".join(tags) + "\t")
+    hook("tag_changed", name, "0")
+
+
+def run(args: list[str]):
+    with open(path("commands"), "a") as commands:
+        commands.write(" ".join(args) + "\n")
+
+    if args[0] == "chain":
+        separator, command = args[1], []
+        for arg in args[2:] + [separator]:
+            if arg == separator:
+                run(command)
+                command = []
+            else:
+                command.append(arg)
+    elif args[0] == "tag_status":
+        with open(path("tags")) as file:
+            sys.stdout.write(file.read())
+    elif args[0] == "use":
+        use(args[1])
+    elif args[0] == "attr":
+        focus = path("focus")
+        if os.path.exists(focus) and args[1].startswith("clients.focus."):
+            with open(focus) as file:
+                winid, title = file.read().split("\t", 1)
+            sys.stdout.write((winid if args[1].endswith(".winid")
+                              else title) + "\n")
+    elif args[0] == "emit_hook":
+        if args[1] == "focus_changed":
+            with open(path("focus"), "w") as file:
+                file.write("\t".join((args[2:] + ["", ""])[:2]))
+        hook(*args[1:])
+
+
+def main() -> int:
+    if sys.argv[1:] == ["--idle"]:
+        return idle()
+    run(sys.argv[1:])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import asyncio
+
+from collections.abc import Callable
+from contextlib import suppress
+from typing import Optional
+
+TAG_HOOKS = frozenset((
+    "tag_changed",
+    "tag_flags",
+    "tag_added",
+    "tag_removed",
+    "tag_renamed",
+    "reload",
+))
+WINDOW_HOOKS = frozenset(("focus_changed", "window_title_changed"))
+SEPARATOR = "\x1e"
+RESTART_DELAY = 1.0
+
+
+class Herbstclient:
+    def __init__(self, path: str="herbstclient"):
+        self.path: str = path
+        self.spawned: int = 0
+        self._queues: dict[asyncio.Queue, Callable[[list[str]], bool]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._pending: list[tuple[str, ...]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    def subscribe(
+        self,
+        predicate: Callable[[list[str]], bool]
+    ) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues[queue] = predicate
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._queues.pop(queue, None)
+        if not self._queues and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    async def _idle(self):
+        process = await asyncio.create_subprocess_exec(
+            self.path, "--idle", stdout=asyncio.subprocess.PIPE)
+        self.spawned += 1
+        try:
+            while line := await process.stdout.readline():
+                hook = line.decode(errors="replace").rstrip("\n").split("\t")
+                for queue, predicate in self._queues.items():
+                    if predicate(hook):
+                        queue.put_nowait(hook)
+        finally:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+
+    async def _listen(self):
+        while True:
+            with suppress(OSError):
+                await self._idle()
+            for queue, predicate in self._queues.items():
+                if predicate(["reload"]):
+                    queue.put_nowait(["reload"])
+            await asyncio.sleep(RESTART_DELAY)
+
+    async def query(self, *args: str) -> str:
+        process = await asyncio.create_subprocess_exec(
+            self.path, *args, stdout=asyncio.subprocess.PIPE)
+        self.spawned += 1
+        out, _ = await process.communicate()
+        return out.decode(errors="replace")
+
+    async def command(self, *args: str):
+        self._pending.append(args)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        await asyncio.shield(self._flusher)
+
+    async def _flush(self):
+        while self._pending:
+            await asyncio.sleep(0)
+            commands, self._pending = self._pending, []
+            if len(commands) == 1:
+                args = list(commands[0])
+            else:
+                args = ["chain", SEPARATOR]
+                for command in commands:
+                    args += [*command, SEPARATOR]
+                args.pop()
+
+            process = await asyncio.create_subprocess_exec(self.path, *args)
+            self.spawned += 1
+            await process.wait()
+
+
+def parse_tags(status: str) -> list[tuple[str, str]]:
+    return [(field[1:], field[0]) for field in status.split("\t") if field]
+
+
+client = Herbstclient()
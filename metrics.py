@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import functools
+import weakref
+
+from collections.abc import AsyncIterator, Callable
+from contextlib import suppress
+from typing import Any, Optional
+
+enabled: bool = False
+
+_stats: dict[int, "Stats"] = {}
+_pending: set["Stats"] = set()
+_sources: dict[str, Callable[[], dict[str, Any]]] = {}
+_count: int = 0
+
+
+class Stats:
+    def __init__(self, name: str):
+        self.name: str = name
+        self.updates: int = 0
+        self.busy_ns: int = 0
+        self.first_ns: Optional[int] = None
+        self.yielded_ns: int = 0
+        self.flushes: int = 0
+        self.flush_ns: int = 0
+        self.flush_max_ns: int = 0
+
+    def update(self):
+        now = time.perf_counter_ns()
+        if self.first_ns is None:
+            self.first_ns = now
+        self.updates += 1
+        if self not in _pending:
+            self.yielded_ns = now
+            _pending.add(self)
+
+    def snapshot(self, now: int) -> dict[str, Any]:
+        elapsed = (now - self.first_ns) / 1e9 if self.first_ns else 0.0
+        return {
+            "name": self.name,
+            "updates": self.updates,
+            "rate": self.updates / elapsed if elapsed > 0 else 0.0,
+            "busy_us": self.busy_ns / 1e3,
+            "busy_per_update_us": (self.busy_ns / self.updates / 1e3
+                                   if self.updates else 0.0),
+            "flush_avg_us": (self.flush_ns / self.flushes / 1e3
+                             if self.flushes else 0.0),
+            "flush_max_us": self.flush_max_ns / 1e3,
+        }
+
+
+class _Timed:
+    def __init__(self, awaitable, stats: Stats):
+        self._awaitable = awaitable
+        self._stats = stats
+
+    def __await__(self):
+        coro = self._awaitable
+        value, error = None, None
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                if error is None:
+                    request = coro.send(value)
+                else:
+                    request = coro.throw(error)
+            except StopIteration as stop:
+                self._stats.busy_ns += time.perf_counter_ns() - start
+                return stop.value
+            self._stats.busy_ns += time.perf_counter_ns() - start
+
+            try:
+                value, error = (yield request), None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+
+def stats(widget: Any) -> Stats:
+    global _count
+
+    try:
+        return _stats[id(widget)]
+    except KeyError:
+        _count += 1
+        result = Stats(f"{type(widget).__name__}#{_count}")
+        _stats[id(widget)] = result
+        weakref.finalize(widget, _stats.pop, id(widget), None)
+        return result
+
+
+async def _metered(widget: Any, it: AsyncIterator[str]) -> AsyncIterator[str]:
+    widget_stats = stats(widget)
+    try:
+        while True:
+            try:
+                value = await _Timed(it.__anext__(), widget_stats)
+            except StopAsyncIteration:
+                return
+            widget_stats.update()
+            yield value
+    finally:
+        await it.aclose()
+
+
+def instrument(method: Callable[[Any], AsyncIterator[str]]):
+    @functools.wraps(method)
+    def __aiter__(self) -> AsyncIterator[str]:
+        if not enabled:
+            return method(self)
+        return _metered(self, method(self))
+
+    return __aiter__
+
+
+def flushed():
+    if not _pending:
+        return
+    now = time.perf_counter_ns()
+    for widget_stats in _pending:
+        latency = now - widget_stats.yielded_ns
+        widget_stats.flushes += 1
+        widget_stats.flush_ns += latency
+        widget_stats.flush_max_ns = max(widget_stats.flush_max_ns, latency)
+    _pending.clear()
+
+
+def register(name: str, source: Callable[[], dict[str, Any]]):
+    _sources[name] = source
+
+
+def snapshot() -> dict[str, Any]:
+    now = time.perf_counter_ns()
+    result: dict[str, Any] = {
+        name: source() for name, source in _sources.items()
+    }
+    result["widgets"] = sorted(
+        (widget_stats.snapshot(now) for widget_stats in _stats.values()),
+        key=lambda item: item["busy_us"], reverse=True)
+    return result
+
+
+def dump(file=sys.stderr):
+    file.write(json.dumps(snapshot(), indent=1) + "\n")
+    file.flush()
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+async def serve(path: Optional[str]=None):
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGUSR1, dump)
+
+    if path is None:
+        return
+
+    async def handle(reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        writer.write(json.dumps(snapshot()).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+    with suppress(FileNotFoundError):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path)
+    async with server:
+        await server.serve_forever()
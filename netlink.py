@@ -0,0 +1,239 @@
+import errno
+import fcntl
+import socket
+import struct
+import asyncio
+
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Optional
+
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+IFLA_IFNAME = 3
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+IFF_UP = 0x1
+IFF_RUNNING = 0x40
+
+RT_SCOPE_UNIVERSE = 0
+SIOCGIFADDR = 0x8915
+
+_header = struct.Struct("=IHHII")
+_ifinfomsg = struct.Struct("=BxHiII")
+_ifaddrmsg = struct.Struct("=BBBBi")
+_rtattr = struct.Struct("=HH")
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _attributes(data: bytes, offset: int, end: int) -> dict[int, bytes]:
+    result = {}
+    while offset + _rtattr.size <= end:
+        length, type = _rtattr.unpack_from(data, offset)
+        if length < _rtattr.size:
+            break
+        result[type] = data[offset + _rtattr.size:offset + length]
+        offset += _align(length)
+    return result
+
+
+@dataclass
+class Link:
+    name: str
+    up: bool
+
+
+class Netlink:
+    def __init__(self):
+        self.links: dict[int, Link] = {}
+        self.addresses: dict[int, dict[str, tuple[int, int]]] = {}
+        self._seq: int = 0
+        self._dumping: bool = False
+        self._sock = socket.socket(
+            socket.AF_NETLINK,
+            socket.SOCK_RAW | socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC,
+            socket.NETLINK_ROUTE)
+        try:
+            self._sock.bind(
+                (0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        except:
+            self._sock.close()
+            raise
+
+    def close(self):
+        self._sock.close()
+
+    def index(self, name: str) -> Optional[int]:
+        for index, link in self.links.items():
+            if link.name == name:
+                return index
+        return None
+
+    def address(self, name: str) -> Optional[str]:
+        index = self.index(name)
+        if index is None or not self.links[index].up:
+            return None
+
+        found = None
+        for address, (family, scope) in self.addresses.get(index, {}).items():
+            if family == socket.AF_INET:
+                return address
+            if found is None and scope == RT_SCOPE_UNIVERSE:
+                found = address
+        return found
+
+    def feed(self, data: bytes) -> bool:
+        changed = False
+        offset = 0
+        while offset + _header.size <= len(data):
+            length, type, _, seq, _ = _header.unpack_from(data, offset)
+            if length < _header.size:
+                break
+            body = offset + _header.size
+            end = min(offset + length, len(data))
+            offset += _align(length)
+
+            if type == NLMSG_DONE:
+                if seq == self._seq:
+                    self._dumping = False
+            elif type == NLMSG_ERROR:
+                error, = struct.unpack_from("=i", data, body)
+                if error and seq == self._seq:
+                    self._dumping = False
+                    raise OSError(-error, "netlink dump failed")
+            elif type in (RTM_NEWLINK, RTM_DELLINK):
+                changed |= self._link(type, data, body, end)
+            elif type in (RTM_NEWADDR, RTM_DELADDR):
+                changed |= self._address(type, data, body, end)
+        return changed
+
+    def _link(self, type: int, data: bytes, body: int, end: int) -> bool:
+        _, _, index, flags, _ = _ifinfomsg.unpack_from(data, body)
+        if type == RTM_DELLINK:
+            self.addresses.pop(index, None)
+            return self.links.pop(index, None) is not None
+
+        attributes = _attributes(data, body + _ifinfomsg.size, end)
+        name = attributes.get(IFLA_IFNAME)
+        if name is None:
+            return False
+        link = Link(name.rstrip(b"\0").decode(),
+                    flags & (IFF_UP | IFF_RUNNING) == IFF_UP | IFF_RUNNING)
+        if self.links.get(index) == link:
+            return False
+        self.links[index] = link
+        return True
+
+    def _address(self, type: int, data: bytes, body: int, end: int) -> bool:
+        family, _, _, scope, index = _ifaddrmsg.unpack_from(data, body)
+        attributes = _attributes(data, body + _ifaddrmsg.size, end)
+        raw = attributes.get(IFA_LOCAL, attributes.get(IFA_ADDRESS))
+        if raw is None:
+            return False
+        address = socket.inet_ntop(family, raw)
+
+        addresses = self.addresses.setdefault(index, {})
+        if type == RTM_DELADDR:
+            return addresses.pop(address, None) is not None
+        if addresses.get(address) == (family, scope):
+            return False
+        addresses[address] = (family, scope)
+        return True
+
+    async def _dump(self, type: int, size: int):
+        loop = asyncio.get_running_loop()
+        self._seq += 1
+        self._dumping = True
+        await loop.sock_sendall(self._sock, _header.pack(
+            _header.size + size, type, NLM_F_REQUEST | NLM_F_DUMP,
+            self._seq, 0) + bytes(size))
+        while self._dumping:
+            self.feed(await loop.sock_recv(self._sock, 65536))
+
+    async def load(self):
+        self.links.clear()
+        self.addresses.clear()
+        await self._dump(RTM_GETLINK, _ifinfomsg.size)
+        await self._dump(RTM_GETADDR, _ifaddrmsg.size)
+
+    async def changes(self) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                data = await loop.sock_recv(self._sock, 65536)
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                await self.load()
+                yield
+                continue
+            if self.feed(data):
+                yield
+
+
+def default_interface() -> Optional[str]:
+    try:
+        with open("/proc/net/route") as route:
+            next(route)
+            for line in route:
+                fields = line.split()
+                if len(fields) > 1 and fields[1] == "00000000":
+                    return fields[0]
+    except OSError:
+        pass
+    return None
+
+
+def read_address(name: str) -> Optional[str]:
+    try:
+        with open(f"/sys/class/net/{name}/operstate") as operstate:
+            if operstate.read().strip() not in ("up", "unknown"):
+                return None
+    except OSError:
+        return None
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            request = struct.pack("256s", name.encode()[:15])
+            result = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)
+            return socket.inet_ntoa(result[20:24])
+        except OSError:
+            pass
+
+    try:
+        with open("/proc/net/if_inet6") as if_inet6:
+            for line in if_inet6:
+                fields = line.split()
+                if fields[-1] == name and int(fields[3], 16) == 0:
+                    return socket.inet_ntop(socket.AF_INET6,
+                                            bytes.fromhex(fields[0]))
+    except OSError:
+        pass
+    return None
+
+
+def counters(name: str) -> Optional[tuple[int, int]]:
+    try:
+        with open(f"/sys/class/net/{name}/statistics/rx_bytes") as rx, \
+             open(f"/sys/class/net/{name}/statistics/tx_bytes") as tx:
+            return int(rx.read()), int(tx.read())
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,151 @@
+import sys
+import asyncio
+import threading
+
+from collections import deque
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any, Optional, TextIO
+
+import metrics
+import policies
+import tracing
+
+if TYPE_CHECKING:
+    from widgets import Widget
+
+
+class Monitor:
+    def __init__(
+        self,
+        geometry: str,
+        fonts: Optional[list[str]]=None,
+        bar: Optional["Widget"]=None
+    ):
+        self.geometry: str = geometry
+        self.fonts: Optional[list[str]] = fonts
+        self.bar: Optional["Widget"] = bar
+
+
+class LogSink:
+    def __init__(
+        self,
+        file: TextIO=sys.stderr,
+        maxlen: int=64
+    ):
+        self._file = file
+        self._lines: deque[str] = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+
+        self.dropped: int = 0
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def write(self, line: str):
+        with self._cond:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._lines:
+                    self._cond.wait()
+                lines = list(self._lines)
+                self._lines.clear()
+
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+
+
+class Output:
+    def __init__(
+        self,
+        writers: list[asyncio.StreamWriter],
+        max_fps: float=0.0,
+        min_interval: float=0.0,
+        log: Optional[LogSink]=None
+    ):
+        self._writers = writers
+        self._log = log
+        self._interval: float = max(1.0 / max_fps if max_fps > 0 else 0.0,
+                                    min_interval)
+        self._frame: Optional[str] = None
+        self._shown: Optional[str] = None
+        self._pending: int = 0
+        self._event = asyncio.Event()
+        self._urgent = asyncio.Event()
+        self._last: float = float("-inf")
+        self._clicked: int = policies.clicked()
+
+        self.produced: int = 0
+        self.written: int = 0
+        self.dropped: int = 0
+        self.coalesced: int = 0
+        self.duplicates: int = 0
+
+    def counters(self) -> dict[str, Any]:
+        return {
+            "produced": self.produced,
+            "written": self.written,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "duplicates": self.duplicates,
+        }
+
+    def push(self, frame: str):
+        self.produced += 1
+        if frame == (self._shown if self._frame is None else self._frame):
+            self.duplicates += 1
+            if self._frame is None:
+                metrics.flushed()
+                tracing.written()
+            return
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self._pending += 1
+        self._event.set()
+        if policies.clicked() != self._clicked:
+            self._urgent.set()
+        tracing.rendered()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._event.wait()
+
+            delay = self._last + self._interval - loop.time()
+            if delay > 0 and not self._urgent.is_set():
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._urgent.wait(), delay)
+            if self._urgent.is_set():
+                self._urgent.clear()
+                self._clicked = policies.clicked()
+
+            self._event.clear()
+            frame, self._frame = self._frame, None
+            if self._pending > 1:
+                self.coalesced += 1
+            self._pending = 0
+
+            if frame == self._shown:
+                self.duplicates += 1
+                metrics.flushed()
+                tracing.written()
+                continue
+            self._shown = frame
+
+            # an urgent frame takes the next slot early rather than adding one
+            self._last = max(loop.time(), self._last + self._interval)
+            data = (frame + "\n").encode()
+            for writer in self._writers:
+                writer.write(data)
+            await asyncio.gather(*(writer.drain() for writer in self._writers))
+            self.written += 1
+            metrics.flushed()
+            tracing.written()
+
+            if self._log is not None:
+                self._log.write(frame)
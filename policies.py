@@ -0,0 +1,119 @@
+import asyncio
+
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+LOW = 0
+NORMAL = 1
+HIGH = 2
+
+# ids of the Buttons enclosing the widget being iterated
+scope: ContextVar[tuple[int, ...]] = ContextVar("scope", default=())
+
+_clicks: dict[int, int] = {}
+_total: int = 0
+
+
+def urgent(id: int):
+    global _total
+
+    _total += 1
+    _clicks[id] = _clicks.get(id, 0) + 1
+
+
+def clicked(ids: Optional[tuple[int, ...]]=None) -> int:
+    if ids is None:
+        return _total
+    return sum(_clicks.get(id, 0) for id in ids)
+
+
+@dataclass(frozen=True)
+class Policy:
+    max_rate: float = 0.0
+    min_hold: float = 0.0
+    priority: int = NORMAL
+    max_defer: float = 1.0
+
+    @property
+    def interval(self) -> float:
+        return max(1.0 / self.max_rate if self.max_rate > 0 else 0.0,
+                   self.min_hold)
+
+
+class Gate:
+    def __init__(
+        self,
+        policy: Policy,
+        store: Callable[[str], None],
+        wake: Callable[[], None],
+        scope: tuple[int, ...]=()
+    ):
+        self._policy = policy
+        self._store = store
+        self._wake = wake
+        self._scope = scope
+        self._clicked: int = clicked(scope)
+        self._last: float = float("-inf")
+        self._pending: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lazy: Optional[asyncio.TimerHandle] = None
+        self.deferred: int = 0
+
+    def push(self, value: str):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if (self._last == float("-inf") or self._policy.priority >= HIGH
+                or self._urgent()):
+            self._emit(value, now, True)
+            return
+
+        due = self._last + self._policy.interval
+        if now < due:
+            self._pending = value
+            self.deferred += 1
+            if self._timer is None:
+                self._timer = loop.call_at(due, self._release)
+            return
+        self._emit(value, now, self._policy.priority > LOW)
+
+    def _urgent(self) -> bool:
+        if not self._scope:
+            return False
+        count = clicked(self._scope)
+        if count == self._clicked:
+            return False
+        self._clicked = count
+        return True
+
+    def _release(self):
+        self._timer = None
+        value, self._pending = self._pending, None
+        if value is not None:
+            self._emit(value, asyncio.get_running_loop().time(),
+                       self._policy.priority > LOW)
+
+    def _emit(self, value: str, now: float, wake: bool):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
+        self._last = now
+        self._store(value)
+
+        if wake:
+            self._wake()
+        elif self._lazy is None:
+            self._lazy = asyncio.get_running_loop().call_later(
+                self._policy.max_defer, self._wake_lazy)
+
+    def _wake_lazy(self):
+        self._lazy = None
+        self._wake()
+
+    def close(self):
+        for timer in (self._timer, self._lazy):
+            if timer is not None:
+                timer.cancel()
+        self._timer = self._lazy = None
@@ -0,0 +1,81 @@
+import asyncio
+
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager, suppress
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import pulsectl_asyncio
+
+FACILITIES = ("sink", "source", "sink_input", "source_output", "server")
+
+
+class PulsePool:
+    def __init__(self, name: str="pybar"):
+        self._name = name
+        self._pulse: Optional["pulsectl_asyncio.PulseAsync"] = None
+        self._users: int = 0
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+        self._queues: dict[asyncio.Queue, Callable[[Any], bool]] = {}
+
+    async def acquire(self) -> "pulsectl_asyncio.PulseAsync":
+        async with self._lock:
+            if self._pulse is not None and self._listener.done():
+                self._pulse.disconnect()
+                self._pulse = None
+            if self._pulse is None:
+                import pulsectl_asyncio
+
+                pulse = pulsectl_asyncio.PulseAsync(self._name)
+                await pulse.connect()
+                self._pulse = pulse
+                self._listener = asyncio.create_task(self._listen(pulse))
+            self._users += 1
+            return self._pulse
+
+    async def release(self):
+        async with self._lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._pulse.disconnect()
+            self._pulse = None
+            self._listener = None
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator["pulsectl_asyncio.PulseAsync"]:
+        pulse = await self.acquire()
+        try:
+            yield pulse
+        finally:
+            await self.release()
+
+    def subscribe(self, predicate: Callable[[Any], bool]) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues[queue] = predicate
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._queues.pop(queue, None)
+
+    async def _listen(self, pulse: "pulsectl_asyncio.PulseAsync"):
+        # subscribers get the failure as an item on their queue, since the
+        # connection is gone for all of them
+        try:
+            async for event in pulse.subscribe_events(*FACILITIES):
+                for queue, predicate in self._queues.items():
+                    if predicate(event):
+                        queue.put_nowait(event)
+            error: Exception = ConnectionError("pulse event stream ended")
+        except Exception as e:
+            error = e
+        for queue in self._queues:
+            queue.put_nowait(error)
+
+
+pool = PulsePool()
@@ -0,0 +1,144 @@
+import os
+import time
+import asyncio
+
+from collections.abc import Callable
+from typing import Any, Optional
+
+from timers import wheel
+
+
+class Source:
+    def __init__(self, path: str, size: int=4096):
+        self.path: str = path
+        self._fd: int = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self._buffer = bytearray(size)
+
+    def read(self) -> tuple[bytearray, int]:
+        while True:
+            length = os.preadv(self._fd, [self._buffer], 0)
+            if length < len(self._buffer):
+                return self._buffer, length
+            self._buffer = bytearray(len(self._buffer) * 2)
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _field(buffer: bytearray, length: int, key: bytes) -> int:
+    start = buffer.find(key, 0, length)
+    if start < 0:
+        raise ValueError(f"{key!r} not found")
+    end = buffer.find(b"\n", start, length)
+    return int(buffer[start + len(key):end if end >= 0 else length].split()[0])
+
+
+def parse_cpu(buffer: bytearray, length: int) -> tuple[int, int]:
+    fields = [int(field) for field in
+              buffer[:buffer.find(b"\n", 0, length)].split()[1:9]]
+    idle = fields[3] + fields[4]
+    return sum(fields) - idle, sum(fields)
+
+
+def parse_memory(buffer: bytearray, length: int) -> tuple[int, int]:
+    return (_field(buffer, length, b"MemTotal:"),
+            _field(buffer, length, b"MemAvailable:"))
+
+
+def parse_load(buffer: bytearray, length: int) -> tuple[float, float, float]:
+    one, five, fifteen = buffer[:length].split(maxsplit=3)[:3]
+    return float(one), float(five), float(fifteen)
+
+
+def parse_thermal(buffer: bytearray, length: int) -> float:
+    return int(buffer[:length]) / 1000.0
+
+
+class Sampler:
+    def __init__(
+        self,
+        path: str,
+        parse: Callable[[bytearray, int], Any],
+        period: float=1.0
+    ):
+        self.path: str = path
+        self.period: float = period
+        self.value: Any = None
+        self.previous: Any = None
+        self.ticks: int = 0
+        self.busy_ns: int = 0
+        self._parse = parse
+        self._source: Optional[Source] = None
+        self._events: set[asyncio.Event] = set()
+        self._tick = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self):
+        start = time.perf_counter_ns()
+        self.previous = self.value
+        self.value = self._parse(*self._source.read())
+        self.busy_ns += time.perf_counter_ns() - start
+        self.ticks += 1
+
+    def subscribe(self) -> asyncio.Event:
+        event = asyncio.Event()
+        if not self._events:
+            self._source = Source(self.path)
+            self.value = None
+            self.sample()
+            wheel.subscribe(self.period, self._tick)
+            self._task = asyncio.create_task(self._pump())
+        self._events.add(event)
+        return event
+
+    def unsubscribe(self, event: asyncio.Event):
+        self._events.discard(event)
+        if self._events or self._task is None:
+            return
+        wheel.unsubscribe(self.period, self._tick)
+        self._task.cancel()
+        self._task = None
+        self._source.close()
+        self._source = None
+
+    async def _pump(self):
+        while True:
+            await self._tick.wait()
+            self._tick.clear()
+            self.sample()
+            for event in self._events:
+                event.set()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ticks": self.ticks,
+            "tick_us": self.busy_ns / self.ticks / 1e3 if self.ticks else 0.0,
+        }
+
+
+PARSERS: dict[str, tuple[str, Callable[[bytearray, int], Any]]] = {
+    "cpu": ("/proc/stat", parse_cpu),
+    "memory": ("/proc/meminfo", parse_memory),
+    "load": ("/proc/loadavg", parse_load),
+}
+
+_samplers: dict[tuple[str, float], Sampler] = {}
+
+
+def sampler(kind: str, period: float=1.0) -> Sampler:
+    key = (kind, period)
+    if key not in _samplers:
+        if kind.startswith("thermal"):
+            zone = kind[len("thermal"):] or "0"
+            path = f"/sys/class/thermal/thermal_zone{zone}/temp"
+            _samplers[key] = Sampler(path, parse_thermal, period)
+        else:
+            _samplers[key] = Sampler(*PARSERS[kind], period)
+    return _samplers[key]
+
+
+def samplers() -> dict[str, dict[str, Any]]:
+    return {
+        f"{kind}@{period:g}": item.stats()
+        for (kind, period), item in _samplers.items()
+    }
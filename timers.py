@@ -0,0 +1,171 @@
+import os
+import sys
+import math
+import time
+import errno
+import ctypes
+import asyncio
+
+from contextlib import suppress
+from typing import Optional
+
+JUMP = 0.5
+
+CLOCK_REALTIME = 0
+TFD_TIMER_ABSTIME = 1
+TFD_TIMER_CANCEL_ON_SET = 2
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", _Timespec), ("it_value", _Timespec)]
+
+
+def _wall() -> float:
+    now = time.time()
+    return now + time.localtime(now).tm_gmtoff
+
+
+def _libc() -> Optional[ctypes.CDLL]:
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "timerfd_create"):
+        return None
+    return libc
+
+
+class ClockWatch:
+    # a realtime timerfd armed with TFD_TIMER_CANCEL_ON_SET becomes readable
+    # with ECANCELED whenever the clock is stepped, including on resume
+    def __init__(self, libc: ctypes.CDLL):
+        self._libc = libc
+        self.fd: int = libc.timerfd_create(
+            CLOCK_REALTIME, os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "timerfd_create failed")
+        self.arm()
+
+    def arm(self):
+        spec = _Itimerspec()
+        spec.it_value.tv_sec = int(time.time()) + 365 * 86400
+        if self._libc.timerfd_settime(
+                self.fd, TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET,
+                ctypes.byref(spec), None) < 0:
+            raise OSError(ctypes.get_errno(), "timerfd_settime failed")
+
+    def stepped(self) -> bool:
+        try:
+            os.read(self.fd, 8)
+        except BlockingIOError:
+            return False
+        except OSError as e:
+            if e.errno != errno.ECANCELED:
+                raise
+            self.arm()
+            return True
+        self.arm()
+        return False
+
+    def close(self):
+        os.close(self.fd)
+
+
+def clock_watch() -> Optional[ClockWatch]:
+    libc = _libc()
+    if libc is None:
+        return None
+    try:
+        return ClockWatch(libc)
+    except OSError:
+        return None
+
+
+class Wheel:
+    def __init__(self, max_sleep: Optional[float]=None):
+        self.max_sleep: Optional[float] = max_sleep
+        self._periods: dict[float, set[asyncio.Event]] = {}
+        self._fired: dict[float, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._stepped: bool = False
+        self.wakeups: int = 0
+
+    def subscribe(self, period: float, event: asyncio.Event):
+        if period not in self._periods:
+            self._periods[period] = set()
+            self._fired[period] = math.floor(_wall() / period)
+        self._periods[period].add(event)
+        if self._task is None or self._task.done():
+            self._changed = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._finished)
+        self._changed.set()
+
+    def unsubscribe(self, period: float, event: asyncio.Event):
+        events = self._periods.get(period)
+        if events is None:
+            return
+        events.discard(event)
+        if not events:
+            del self._periods[period]
+            del self._fired[period]
+        if not self._periods and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _finished(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"timer wheel failed: {task.exception()!r}",
+                  file=sys.stderr)
+
+    def _fire(self, wall: float, all: bool=False):
+        for period, events in self._periods.items():
+            slot = math.floor(wall / period)
+            if all or slot != self._fired[period]:
+                self._fired[period] = slot
+                for event in events:
+                    event.set()
+
+    def _check(self, watch: ClockWatch):
+        if watch.stepped():
+            self._stepped = True
+            self._changed.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        changed = self._changed
+        watch = clock_watch()
+        if watch is not None:
+            loop.add_reader(watch.fd, self._check, watch)
+
+        offset = time.time() - time.monotonic()
+        try:
+            while self._periods:
+                wall = _wall()
+                delay = min(
+                    (math.floor(wall / period) + 1) * period - wall
+                    for period in self._periods) + 0.001
+                if self.max_sleep is not None:
+                    delay = min(delay, self.max_sleep)
+                changed.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(changed.wait(), delay)
+                self.wakeups += 1
+
+                current = time.time() - time.monotonic()
+                jumped = self._stepped or abs(current - offset) > JUMP
+                self._stepped = False
+                offset = current
+                self._fire(_wall(), jumped)
+        finally:
+            if watch is not None:
+                loop.remove_reader(watch.fd)
+                watch.close()
+
+
+wheel = Wheel()
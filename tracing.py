@@ -0,0 +1,123 @@
+import time
+import asyncio
+
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+import output
+
+STAGES = ("read", "parse", "callback", "roundtrip", "render", "write")
+TIMEOUT_NS = 5_000_000_000
+
+current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+_sink: Optional["output.LogSink"] = None
+_open: list["Trace"] = []
+_count: int = 0
+
+
+class Trace:
+    def __init__(self, id: int, start_ns: Optional[int]=None):
+        self.id: int = id
+        self.button: Optional[int] = None
+        self.start_ns: int = (start_ns if start_ns is not None
+                              else time.monotonic_ns())
+        self.marks: dict[str, int] = {}
+        self.waiting: int = 0
+
+    def mark(self, stage: str):
+        self.marks.setdefault(stage, time.monotonic_ns())
+
+    def parsed(self, button: int):
+        self.button = button
+        self.mark("parse")
+        _open.append(self)
+
+    def line(self) -> str:
+        fields = [str(self.id), str(self.button), str(self.start_ns)]
+        last = self.start_ns
+        for stage in STAGES:
+            mark = self.marks.get(stage)
+            if mark is None:
+                fields.append("-")
+                continue
+            fields.append(str((mark - last) // 1000))
+            last = mark
+        return "\t".join(fields)
+
+
+def enable(path: str):
+    global _sink
+
+    _sink = output.LogSink(open(path, "a"), 1024)
+    _sink.write("\t".join(("#id", "button", "start_ns",
+                           *(f"{stage}_us" for stage in STAGES))))
+
+
+def watch(reader: asyncio.StreamReader) -> Optional[deque[int]]:
+    if _sink is None:
+        return None
+
+    # stamp every line when its newline reaches the loop, so the "read"
+    # stage covers the wait between the pipe waking us and readline()
+    arrivals: deque[int] = deque()
+    feed_data = reader.feed_data
+
+    def stamped(data: bytes):
+        now = time.monotonic_ns()
+        arrivals.extend(now for _ in range(data.count(b"\n")))
+        feed_data(data)
+
+    reader.feed_data = stamped
+    return arrivals
+
+
+def begin(arrivals: Optional[deque[int]]=None) -> Optional[Trace]:
+    global _count
+
+    if _sink is None:
+        return None
+    _count += 1
+    trace = Trace(_count, arrivals.popleft() if arrivals else None)
+    trace.mark("read")
+    return trace
+
+
+def expect() -> Optional[Trace]:
+    trace = current.get()
+    if trace is not None:
+        trace.waiting += 1
+    return trace
+
+
+def arrived(traces: list[Optional[Trace]]):
+    for trace in traces:
+        if trace is None:
+            continue
+        trace.waiting -= 1
+        if trace.waiting == 0:
+            trace.mark("roundtrip")
+
+
+def _finish(trace: Trace):
+    _open.remove(trace)
+    _sink.write(trace.line())
+
+
+def rendered():
+    for trace in _open:
+        if "callback" in trace.marks and trace.waiting <= 0:
+            trace.mark("render")
+
+
+def written():
+    if not _open:
+        return
+    now = time.monotonic_ns()
+    for trace in list(_open):
+        if "render" in trace.marks:
+            trace.mark("write")
+            _finish(trace)
+        elif now - trace.start_ns > TIMEOUT_NS:
+            _finish(trace)
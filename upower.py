@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Tuple
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
 from sdbus import (
+    SdBus,
     DbusDeprecatedFlag,
     DbusInterfaceCommonAsync,
     DbusNoReplyFlag,
@@ -296,3 +298,72 @@ class UPowerDevice(
     )
     def icon_name(self) -> str:
         raise NotImplementedError
+
+
+UPOWER_DEVICE = "org.freedesktop.UPower.Device"
+
+
+class Device:
+    def __init__(self, proxy: UPowerDevice):
+        self.proxy = proxy
+        self.properties: Dict[str, Any] = {}
+        self._queues: Set[asyncio.Queue] = set()
+        self._loaded: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._queues.discard(queue)
+
+    async def load(self):
+        if self._loaded is None:
+            self._listener = asyncio.create_task(self._listen())
+            self._loaded = asyncio.create_task(self._fetch())
+        await asyncio.shield(self._loaded)
+
+    async def _fetch(self):
+        # the public properties_get_all_dict() renames members to their
+        # python names; PropertiesChanged carries D-Bus names, so fetch
+        # the raw GetAll reply for this one interface instead
+        properties = await self.proxy._properties_get_all(UPOWER_DEVICE)
+        for name, (_, value) in properties.items():
+            self.properties[name] = value
+
+    async def _listen(self):
+        async for interface, changed, _ in self.proxy.properties_changed:
+            if interface != UPOWER_DEVICE:
+                continue
+            values = {name: value for name, (_, value) in changed.items()}
+            self.properties.update(values)
+            for queue in self._queues:
+                queue.put_nowait(values)
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._loaded is not None:
+            self._loaded.cancel()
+
+
+class UPowerClient:
+    def __init__(self, bus: Optional[SdBus]=None):
+        self._bus = bus
+        self.upower = UPower.new_proxy(UPOWER, UPOWER_OBJECT, bus)
+        self._devices: Dict[str, Device] = {}
+
+    async def device(self, path: str) -> Device:
+        device = self._devices.get(path)
+        if device is None:
+            proxy = UPowerDevice.new_proxy(UPOWER, path, self._bus)
+            device = self._devices[path] = Device(proxy)
+        await device.load()
+        return device
+
+    def forget(self, path: str):
+        device = self._devices.pop(path, None)
+        if device is not None:
+            device.close()
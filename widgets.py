@@ -1,27 +1,95 @@
+import sys
 import asyncio
+import heapq
+import inspect
 import time
-import sdbus
-import pulsectl_asyncio
+import types
+import weakref
 
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 from collections.abc import (
     Iterable,
     Callable,
     AsyncIterator,
 )
-from typing import Optional
-from contextlib import suppress
+from typing import TYPE_CHECKING, Any, Optional
+from functools import partial
+from dataclasses import dataclass
+from concurrent.futures import Executor
 
-from upower import *
+import metrics
+import tracing
+import netlink
+import sysstat
+import herbstluft
+import workers
+import policies
+
+from pulse import pool
+from timers import wheel
+
+if TYPE_CHECKING:
+    import pulsectl_asyncio
+
+    from upower import Device, UPowerClient
+
+
+def _intern(value: str) -> str:
+    return sys.intern(value) if type(value) is str else value
 
 
 class Widget(metaclass=ABCMeta):
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "__aiter__" in cls.__dict__:
+            cls.__aiter__ = metrics.instrument(cls.__dict__["__aiter__"])
+
     @abstractmethod
     async def __aiter__(self) -> AsyncIterator[str]:
         pass
 
+    @property
+    def policy(self) -> Optional[policies.Policy]:
+        return getattr(self, "_policy", None)
+
+    def static(self) -> Optional[str]:
+        return None
+
+    def limit(
+        self,
+        max_rate: float=0.0,
+        min_hold: float=0.0,
+        priority: int=policies.NORMAL,
+        max_defer: float=1.0
+    ) -> "Widget":
+        self._policy = policies.Policy(max_rate, min_hold, priority,
+                                       max_defer)
+        return self
+
+
+class Container(Widget):
+    __slots__ = ()
+
+    def watch(self, callback: Callable[[], None]):
+        if self._watchers is None:
+            self._watchers = []
+        self._watchers.append(callback)
+
+    def unwatch(self, callback: Callable[[], None]):
+        self._watchers.remove(callback)
+
+    def _changed(self):
+        if self._watchers:
+            for callback in list(self._watchers):
+                callback()
+
+
+class Box(Container, list):
+    __slots__ = ("__weakref__", "_policy", "_sep", "_keys", "_watchers")
 
-class Box(Widget, list):
     def __init__(
         self,
         children: Optional[Iterable[Widget]]=None,
@@ -29,101 +97,138 @@ class Box(Widget, list):
     ):
         super(list, self).__init__()
 
-        self._sep: str = sep
-        self._queue = asyncio.Queue()
+        self._sep: str = _intern(sep)
+        self._keys: list[object] = []
+        self._watchers: Optional[list[Callable[[], None]]] = None
 
         if children is not None:
             self.extend(children)
 
     def append(self, widget: Widget, /):
-        self._queue.put_nowait((0, len(self)))
         super().append(widget)
+        self._keys.append(object())
+        self._changed()
 
     def remove(self, widget: Widget, /):
         index = self.index(widget)
-        self._queue.put_nowait((1, index))
         super().__delitem__(index)
+        del self._keys[index]
+        self._changed()
 
     def insert(self, index: int, widget: Widget, /):
-        self._queue.put_nowait((0, index))
         super().insert(index, widget)
+        self._keys.insert(index, object())
+        self._changed()
 
     def pop(self, index: int=-1, /):
-        self._queue.put_nowait((1, index))
-        return super().pop(index)
+        value = super().pop(index)
+        self._keys.pop(index)
+        self._changed()
+        return value
 
     def extend(self, children: Iterable[Widget], /):
-        for i in range(len(children)):
-            self._queue.put_nowait((0, i))
+        children = list(children)
         super().extend(children)
+        self._keys.extend(object() for _ in children)
+        self._changed()
 
     def clear(self, /):
-        for i in range(len(self) - 1, -1, -1):
-            self._queue.put_nowait((1, i))
         super().clear()
+        self._keys.clear()
+        self._changed()
 
     def __setitem__(self, index: int, widget: Widget, /):
-        if index < 0:
-            index = len(self) + index
-        self._queue.put_nowait((1, index))
-        self._queue.put_nowait((0, index))
         super().__setitem__(index, widget)
+        self._keys[index] = object()
+        self._changed()
 
     def __delitem__(self, index: int, /):
-        self._queue.put_nowait((1, index))
         super().__delitem__(index)
+        del self._keys[index]
+        self._changed()
 
     async def __aiter__(self) -> AsyncIterator[str]:
         event = asyncio.Event()
-        values: list[str] = []
-        tasks: list[list[asyncio.Task]] = []
-
-        async def update(index: int):
-            async for value in self[index]:
-                values[index] = value
-                if all(v is not None for v in values):
-                    event.set()
+        values: dict[object, str] = {}
+        tasks: dict[object, asyncio.Task] = {}
+        errors: list[BaseException] = []
+        scope = policies.scope.get()
 
-        async def process_queue(tg: asyncio.TaskGroup):
-            while True:
-                job, index = await self._queue.get()
+        async def update(key: object, widget: Widget):
+            policies.scope.set(scope)
 
-                if job == 0:
-                    task = tg.create_task(update(index))
-                    if index >= len(tasks):
-                        tasks.append([task])
-                    else:
-                        tasks[index].append(task)
-                    values.insert(index, None)
-                elif job == 1:
-                    tasks[index][-1].cancel()
-                    del values[index]
-                elif job == 2:
-                    break
+            def store(value: str):
+                values[key] = value
 
-                self._queue.task_done()
+            def wake():
+                if len(values) == len(self._keys):
+                    event.set()
 
-        async with asyncio.TaskGroup() as tg:
-            queue_task = tg.create_task(process_queue(tg))
-            while (values or not (
-                tasks
-                and all(all(t.done() for t in l) for l in tasks)
-            )):
+            gate = None
+            if widget.policy is not None:
+                gate = policies.Gate(widget.policy, store, wake, scope)
+            try:
+                async for value in widget:
+                    if gate is None:
+                        store(value)
+                        wake()
+                    else:
+                        gate.push(value)
+            finally:
+                if gate is not None:
+                    gate.close()
+
+        def finished(key: object, task: asyncio.Task):
+            if tasks.get(key) is task:
+                del tasks[key]
+            if not task.cancelled() and task.exception() is not None:
+                errors.append(task.exception())
+                event.set()
+
+        def sync():
+            live = set(self._keys)
+            for key in [key for key in values if key not in live]:
+                del values[key]
+            for key in [key for key in tasks if key not in live]:
+                tasks.pop(key).cancel()
+
+            for key, widget in zip(self._keys, self):
+                if key in values or key in tasks:
+                    continue
+                if isinstance(widget, (Text, Static)):
+                    values[key] = widget.static()
+                    continue
+                task = asyncio.create_task(update(key, widget))
+                task.add_done_callback(partial(finished, key))
+                tasks[key] = task
+
+            event.set()
+
+        self.watch(sync)
+        sync()
+        try:
+            while True:
                 await event.wait()
-                await self._queue.join()
-                try:
-                    yield self._sep.join(values)
-                except GeneratorExit:
-                    for l in tasks:
-                        for task in l:
-                            task.cancel()
-                    values.clear()
-                    break
                 event.clear()
-            await self._queue.put((2, -1))
+                if errors:
+                    raise errors[0]
+                if self._keys and len(values) == len(self._keys):
+                    yield self._sep.join([values[key] for key in self._keys])
+        finally:
+            self.unwatch(sync)
+            for task in tasks.values():
+                task.cancel()
+
+    def static(self) -> Optional[str]:
+        values = [widget.static() for widget in self]
+        if not values or None in values:
+            return None
+        return self._sep.join(values)
 
 
 class Text(Widget):
+    __slots__ = ("__weakref__", "_policy", "_value")
+
     def __init__(
         self,
         value: str
@@ -133,6 +238,71 @@ class Text(Widget):
     async def __aiter__(self) -> AsyncIterator[str]:
         yield self._value
 
+    def static(self) -> Optional[str]:
+        return self._value
+
+
+class Static(Widget):
+    __slots__ = ("__weakref__", "_policy", "_value", "_source")
+
+    def __init__(
+        self,
+        markup: str,
+        source: Optional[Widget]=None
+    ):
+        self._value = markup
+        self._source = source
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        yield self._value
+
+    def static(self) -> Optional[str]:
+        return self._value
+
+
+class Wrapper(Container):
+    __slots__ = ("__weakref__", "_policy", "_child", "_watchers")
+
+    def __init__(self, child: Optional[Widget]=None):
+        self._child: Widget = Text("") if child is None else child
+        self._watchers: Optional[list[Callable[[], None]]] = None
+
+    @property
+    def child(self) -> Widget:
+        return self._child
+
+    @child.setter
+    def child(self, widget: Widget):
+        self._child = widget
+        self._changed()
+
+    @abstractmethod
+    def _format(self, value: str) -> str:
+        pass
+
+    def _enter(self):
+        pass
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self._enter()
+        holder = Box([self._child])
+
+        def swap():
+            holder[0] = self._child
+
+        self.watch(swap)
+        try:
+            async for value in holder:
+                yield self._format(value)
+        finally:
+            self.unwatch(swap)
+
+    def static(self) -> Optional[str]:
+        value = self._child.static()
+        if value is None:
+            return None
+        return self._format(value)
+
 
 for letter, data in {
     "R": ("ColorSwap", None),
@@ -148,60 +318,278 @@ for letter, data in {
     exec(f"""def __init__(
     self,
     child: Widget=None{"" if data[1] is None else ",\n    arg: str=\"{}\"".format(data[1])}
-):{"" if data[1] is None else "\n    self._arg = arg"}
-    if child is None:
-        child = Text("")
-    self._child: Box = Box([child])
-    
-async def __aiter__(self) -> AsyncIterator[str]:
-    async for value in self._child:
-        yield \"%{{{{{letter}{{0}}}}}}{{1}}\".format({"\"\"" if data[1] is None else "self._arg"}, value)""")
-
-    def get_child(self) -> Widget:
-        return self._child[0]
-
-    def set_child(self, widget: Widget):
-        self._child[0] = widget
-
-    globals()[data[0]] = type(data[0], (Widget,), {
+):{"" if data[1] is None else "\n    self._arg = _intern(arg)"}
+    Wrapper.__init__(self, child)
+
+def _format(self, value: str) -> str:
+    return \"%{{{{{letter}{{0}}}}}}{{1}}\".format({"\"\"" if data[1] is None else "self._arg"}, value)""")
+
+    globals()[data[0]] = type(data[0], (Wrapper,), {
+        "__slots__": () if data[1] is None else ("_arg",),
         "__init__": locals()["__init__"],
-        "__aiter__": locals()["__aiter__"],
-        "child": property(get_child, set_child)
+        "_format": locals()["_format"]
     })
 
 
-class Button(Widget):
-    callbacks: list[Callable[[None], None]] = []
-    used: dict[int, bool] = {}
+class Callbacks:
+    def __init__(self):
+        self._callbacks: dict[int, Any] = {}
+        self._ids: dict[Any, int] = {}
+        self._keys: dict[int, Any] = {}
+        self._refs: dict[int, int] = {}
+        self._blocking: set[int] = set()
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._callbacks)
+
+    def __getitem__(self, id: int) -> Callable[[None], None]:
+        callback = self.get(id)
+        if callback is None:
+            raise KeyError(id)
+        return callback
+
+    def get(self, id: int) -> Optional[Callable[[None], None]]:
+        callback = self._callbacks.get(id)
+        if isinstance(callback, weakref.WeakMethod):
+            return callback()
+        return callback
+
+    def blocking(self, id: int) -> bool:
+        return id in self._blocking
+
+    def acquire(
+        self,
+        callback: Callable[[None], None],
+        key: Any=None,
+        blocking: bool=False
+    ) -> int:
+        ref = callback
+        if isinstance(callback, types.MethodType):
+            ref = weakref.WeakMethod(callback)
+            if key is None:
+                key = (callback.__func__, id(callback.__self__))
+        if key is None:
+            key = callback
+
+        index = self._ids.get(key)
+        if index is None:
+            if self._free:
+                index = heapq.heappop(self._free)
+            else:
+                index = len(self._callbacks)
+            self._ids[key] = index
+            self._keys[index] = key
+            self._callbacks[index] = ref
+            self._refs[index] = 0
+            if blocking:
+                self._blocking.add(index)
+
+        self._refs[index] += 1
+        return index
+
+    def release(self, id: int):
+        self._refs[id] -= 1
+        if self._refs[id] > 0:
+            return
+
+        del self._ids[self._keys.pop(id)]
+        del self._callbacks[id]
+        del self._refs[id]
+        self._blocking.discard(id)
+        heapq.heappush(self._free, id)
+
+
+class Button(Wrapper):
+    __slots__ = ("_button", "_id")
+
+    callbacks = Callbacks()
 
     def __init__(
         self,
         child: Widget,
         callback: Callable[[None], None],
-        button: str="1"
+        button: str="1",
+        key: Any=None,
+        blocking: bool=False
     ):
-        self._button: str = button
-        self._child = Box([child])
+        super().__init__(child)
+        self._button: str = _intern(button)
+        if isinstance(callback, Slot):
+            self._id = callback
+            return
+        if blocking and inspect.iscoroutinefunction(callback):
+            raise TypeError("blocking callbacks can't be coroutine functions")
+        self._id = Button.callbacks.acquire(callback, key, blocking)
+        weakref.finalize(self, Button.callbacks.release, self._id)
+
+    def _enter(self):
+        if isinstance(self._id, int):
+            policies.scope.set(policies.scope.get() + (self._id,))
+
+    def _format(self, value: str) -> str:
+        return "%{{A{0}:{1}:}}{2}%{{A}}".format(self._button,
+                                                self._id,
+                                                value)
+
+
+class Shared(Widget):
+    def __init__(self, child: Widget):
+        self._child = child
+        self._value: Optional[str] = None
+        self._error: Optional[BaseException] = None
+        self._events: set[asyncio.Event] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _pump(self):
         try:
-            index = Button.callbacks.index(callback)
-        except ValueError:
-            index = len(Button.callbacks)
-            Button.callbacks.append(callback)
-        self._id = index
+            async for value in self._child:
+                self._value = value
+                for event in self._events:
+                    event.set()
+        except Exception as e:
+            self._error = e
+            for event in self._events:
+                event.set()
 
-    @property
-    def child(self) -> Widget:
-        return self._child[0]
+    async def __aiter__(self) -> AsyncIterator[str]:
+        event = asyncio.Event()
+        self._events.add(event)
+        if self._task is None:
+            self._error = None
+            self._task = asyncio.create_task(self._pump())
+        if self._value is not None:
+            event.set()
 
-    @child.setter
-    def child(self, widget: Widget):
-        self._child[0] = widget
+        try:
+            while True:
+                await event.wait()
+                event.clear()
+                if self._error is not None:
+                    raise self._error
+                yield self._value
+        finally:
+            self._events.discard(event)
+            if not self._events:
+                self._task.cancel()
+                self._task = None
+                self._value = None
+
+
+@dataclass
+class FoldStats:
+    nodes: int=0
+    tasks: int=0
+
+
+def fold(widget: Widget) -> tuple[Widget, FoldStats]:
+    stats = FoldStats()
+
+    def nodes(widget: Widget) -> int:
+        if isinstance(widget, Box):
+            return 1 + sum(nodes(child) for child in widget)
+        if isinstance(widget, Wrapper):
+            return 1 + nodes(widget.child)
+        return 1
+
+    def tasks(widget: Widget) -> int:
+        if isinstance(widget, Box):
+            return 1 + sum(tasks(child) for child in widget)
+        if isinstance(widget, Wrapper):
+            return 1 + tasks(widget.child)
+        if isinstance(widget, (Text, Static)):
+            return 0
+        return 1
+
+    def collapse(widget: Widget) -> Optional[Static]:
+        if isinstance(widget, Static):
+            return None
+
+        value = widget.static()
+        if value is None:
+            if isinstance(widget, Wrapper):
+                static = collapse(widget.child)
+                if static is not None:
+                    widget.child = static
+            elif isinstance(widget, Box):
+                visit(widget)
+            return None
+
+        stats.nodes += nodes(widget) - 1
+        stats.tasks += tasks(widget)
+        return Static(value, widget)
+
+    def visit(box: Box):
+        for index, child in enumerate(box):
+            static = collapse(child)
+            if static is not None:
+                box[index] = static
+
+    static = collapse(widget)
+    return (widget if static is None else static), stats
+
+
+class Slot(str):
+    def __new__(cls, name: str):
+        return super().__new__(cls, f"\0{name}\0")
+
+
+class Template:
+    def __init__(
+        self,
+        shape: Widget,
+        **types: Callable[[Any], Any]
+    ):
+        markup = shape.static()
+        if markup is None:
+            raise ValueError("template shape must be static")
 
-    async def __aiter__(self) -> AsyncIterator[str]:
-        async for value in self._child:
-            yield "%{{A{0}:{1}:}}{2}%{{A}}".format(self._button,
-                                                   self._id,
-                                                   value)
+        parts = markup.split("\0")
+        for i in range(0, len(parts), 2):
+            parts[i] = parts[i].replace("{", "{{").replace("}", "}}")
+        for i in range(1, len(parts), 2):
+            types.setdefault(parts[i], str)
+            parts[i] = "{" + parts[i] + "}"
+
+        self._shape = shape
+        self._format: str = "".join(parts)
+        self._types: dict[str, Callable[[Any], Any]] = types
+
+    def fill(self, **values: Any) -> str:
+        return self._format.format(**{
+            name: str(self._types[name](value)).replace("%", "%%")
+            for name, value in values.items()
+        })
+
+
+class RenderCache:
+    def __init__(
+        self,
+        render: Callable[..., str],
+        maxsize: int=32
+    ):
+        self._render = render
+        self._cache: OrderedDict[tuple, str] = OrderedDict()
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __call__(self, *state: Any) -> str:
+        try:
+            value = self._cache[state]
+        except KeyError:
+            self.misses += 1
+            value = self._cache[state] = self._render(*state)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+            return value
+
+        self.hits += 1
+        self._cache.move_to_end(state)
+        return value
 
 
 class Clock(Widget):
@@ -212,32 +600,32 @@ class Clock(Widget):
         self._show_secs: bool = show_secs
         self._event = asyncio.Event()
 
-    async def __aiter__(self) -> AsyncIterator[str]:
-        async def sleep():
-            delay = 1.0 if self._show_secs else 60.0 - float(tm.tm_sec)
-            await asyncio.sleep(delay)
-            self._event.set()
-
-        self._event.set()
-        while True:
-            task = asyncio.create_task(sleep())
-            await self._event.wait()
-            if not task.done():
-                task.cancel()
-
-            with suppress(asyncio.CancelledError):
-                await task
+    def _period(self) -> float:
+        return 1.0 if self._show_secs else 60.0
 
-            tm = time.localtime()
-            format = "%d.%m.%y %H:%M"
-            if self._show_secs:
-                format += ":%S"
-
-            text = Text(time.strftime(format, tm))
-            yield await anext(aiter(text))
-            self._event.clear()
+    async def __aiter__(self) -> AsyncIterator[str]:
+        period = self._period()
+        wheel.subscribe(period, self._event)
+        try:
+            while True:
+                format = "%d.%m.%y %H:%M"
+                if self._show_secs:
+                    format += ":%S"
+                # localtime() without an argument reads the coarse clock,
+                # which can still be a second behind the wheel's boundary
+                tm = time.localtime(time.time())
+                yield Text(time.strftime(format, tm)).static()
 
-    def toggle(self):
+                await self._event.wait()
+                self._event.clear()
+                if self._period() != period:
+                    wheel.unsubscribe(period, self._event)
+                    period = self._period()
+                    wheel.subscribe(period, self._event)
+        finally:
+            wheel.unsubscribe(period, self._event)
+
+    async def toggle(self):
         self._show_secs = not self._show_secs
         self._event.set()
 
@@ -245,98 +633,129 @@ class Clock(Widget):
 class Battery(Widget):
     def __init__(
         self,
-        dev: UPowerDevice,
-        font_index: int=0
+        dev: "Device",
+        font_index: int=0,
+        cache_size: int=32
     ):
         self._dev = dev
         self._font_index = font_index
-
-    async def __aiter__(self) -> AsyncIterator[str]:
-        percentage = int(await self._dev.percentage)
-        state = await self._dev.state
-        type = await self._dev.type
-
-        def level() -> int:
-            if percentage <= 5:
-                return 0
-            elif percentage <= 25:
-                return 1
-            elif percentage <= 50:
-                return 2
-            elif percentage <= 75:
-                return 3
-            return 4
-
-        def color() -> str:
-            l = level()
-            if l == 0:
-                return "#ff0000"
-            elif l == 1:
-                return "#ef7d13"
-            elif l == 2:
-                return "#f7db00"
-            elif l == 3:
-                return "#a9f700"
-            return "#25e817"
-
-        def bat_icon() -> str:
-            return chr(ord('\uf244') - level())
-
-        def type_icon():
-            if type == 2:
-                if state in (1, 4):
-                    return '\ue55b'
-                else:
-                    return '\uf1e6'
-            elif type == 17:
-                return '\uf025'
-            return ''
-
-        def result():
-            return FColor(
+        self._template = Template(
+            FColor(
                 Box([
                     Box([
                         Font(
                             Box([
-                                Text(bat_icon()),
-                                Text(type_icon())
-                            ]), str(self._font_index) if self._font_index > 0 else ''),
+                                Text(Slot("bat")),
+                                Text(Slot("type"))
+                            ]), str(font_index) if font_index > 0 else ''),
                         Font()
                     ]),
-                    Text(str(percentage) + '%')
-                ], ' '), color())
-
-        yield await anext(aiter(result()))
-    
-        async for _, props, _ in self._dev.properties_changed:
-            updated = False
-            for prop, value in props.items():
-                if prop == "Percentage":
-                    percentage = int(value[1])
-                    updated = True
-                elif prop == "State":
-                    state = int(value[1])
-                    updated = True
-            if updated:
-                yield await anext(aiter(result()))
+                    Text(Slot("percentage"))
+                ], ' '), Slot("color")),
+            percentage=lambda value: f"{value}%")
+        self.cache = RenderCache(self._render, cache_size)
+
+    def _render(self, percentage: int, state: int, type: int) -> str:
+        if percentage <= 5:
+            level = 0
+        elif percentage <= 25:
+            level = 1
+        elif percentage <= 50:
+            level = 2
+        elif percentage <= 75:
+            level = 3
+        else:
+            level = 4
+
+        color = ("#ff0000", "#ef7d13", "#f7db00", "#a9f700", "#25e817")[level]
+        bat_icon = chr(ord('\uf244') - level)
+
+        type_icon = ''
+        if type == 2:
+            if state in (1, 4):
+                type_icon = '\ue55b'
+            else:
+                type_icon = '\uf1e6'
+        elif type == 17:
+            type_icon = '\uf025'
+
+        return self._template.fill(bat=bat_icon,
+                                   type=type_icon,
+                                   percentage=percentage,
+                                   color=color)
+
+    def value(self) -> str:
+        props = self._dev.properties
+        return self.cache(int(props["Percentage"]),
+                          props["State"],
+                          props["Type"])
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        queue = self._dev.subscribe()
+        try:
+            await self._dev.load()
+            yield self.value()
+
+            while True:
+                changed = await queue.get()
+                if "Percentage" in changed or "State" in changed:
+                    yield self.value()
+        finally:
+            self._dev.unsubscribe(queue)
 
 
 class BatteryBox(Widget):
-    bus = sdbus.sd_bus_open_system()
-    upower = UPower.new_proxy(UPOWER,
-                              UPOWER_OBJECT,
-                              bus)
+    _client: Optional["UPowerClient"] = None
 
-    def __init__(self, font_index=0):
+    def __init__(self, font_index=0, aggregate: bool=False):
         self._font_index = font_index
+        self._aggregate = aggregate
+
+    @staticmethod
+    def client() -> "UPowerClient":
+        if BatteryBox._client is None:
+            import sdbus
+
+            from upower import UPowerClient
+
+            BatteryBox._client = UPowerClient(sdbus.sd_bus_open_system())
+        return BatteryBox._client
+
+    async def _display_device(self) -> AsyncIterator[str]:
+        client = BatteryBox.client()
+        path = await client.upower.get_display_device()
+        dev = await client.device(path)
+        battery = Battery(dev, self._font_index)
+        reset = FColor().static()
+
+        queue = dev.subscribe()
+        try:
+            while True:
+                if dev.properties.get("IsPresent", False):
+                    yield battery.value() + reset
+                else:
+                    yield ""
+
+                changed = await queue.get()
+                while not ("IsPresent" in changed or "Percentage" in changed
+                           or "State" in changed):
+                    changed = await queue.get()
+        finally:
+            dev.unsubscribe(queue)
 
     async def __aiter__(self) -> AsyncIterator[str]:
+        if self._aggregate:
+            async for value in self._display_device():
+                yield value
+            return
+
+        client = BatteryBox.client()
         batteries: dict[str, Battery] = {}
         box = Box(sep=' ')
 
-        async def add_battery(path: str):
-            dev = UPowerDevice.new_proxy(UPOWER, path, BatteryBox.bus)
-            if await dev.type == 1:
+        def add_battery(path: str, dev: "Device"):
+            if dev.properties["Type"] == 1:
+                client.forget(path)
                 return
             bat = Battery(dev, self._font_index)
             batteries[path] = bat
@@ -346,12 +765,15 @@ class BatteryBox(Widget):
             box.append(Box([bat, FColor()]))
 
         async def device_added():
-            async for path in BatteryBox.upower.device_added:
-                await add_battery(path)
+            async for path in client.upower.device_added:
+                add_battery(path, await client.device(path))
 
         async def device_removed():
-            async for path in BatteryBox.upower.device_removed:
-                bat = batteries[path]
+            async for path in client.upower.device_removed:
+                client.forget(path)
+                bat = batteries.get(path)
+                if bat is None:
+                    continue
                 if bat is box[-1][0]:
                     del box[-1]
                     if len(box) > 0:
@@ -361,13 +783,15 @@ class BatteryBox(Widget):
 
                 del batteries[path]
 
-        paths = await BatteryBox.upower.enumerate_devices()
+        paths = await client.upower.enumerate_devices()
 
         if not paths:
             return
 
-        for path in await BatteryBox.upower.enumerate_devices():
-            await add_battery(path)
+        devices = await asyncio.gather(*(client.device(path)
+                                         for path in paths))
+        for path, dev in zip(paths, devices):
+            add_battery(path, dev)
 
         async with asyncio.TaskGroup() as tg:
             added_task = tg.create_task(device_added())
@@ -380,12 +804,42 @@ class BatteryBox(Widget):
 class Volume(Widget):
     def __init__(self,
         spawn_pavu: Optional[Callable[[None], None]]=None,
-        font_index: int=0
+        font_index: int=0,
+        cache_size: int=32
     ):
         self._font_index: int = font_index
         self._spawn_pavu: Optional[Callable[[None], None]] = spawn_pavu
         self._color = "#1b998a"
         self._event = asyncio.Event()
+        self._pulse: Optional["pulsectl_asyncio.PulseAsync"] = None
+        self._sink: Any = None
+        self._delta: float = 0.0
+        self._pending = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._traces: list[Optional[tracing.Trace]] = []
+
+        volume = Box([
+            FColor(
+                Box([
+                    Box([
+                        Font(Text('\uf028'), str(font_index) if font_index > 0 else ''),
+                        Font()
+                    ]),
+                    Text(Slot("volume"))
+        ], ' '), Slot("color")), FColor()])
+
+        pavu_button = volume
+        if spawn_pavu is not None:
+            pavu_button = Button(volume, spawn_pavu)
+
+        self._template = Template(
+            Button(Button(pavu_button, self._volume_up, "4"),
+                   self._volume_down, "5"),
+            volume=lambda value: f"{value}%")
+        self.cache = RenderCache(self._render, cache_size)
+
+    def _render(self, volume: int, color: str) -> str:
+        return self._template.fill(volume=volume, color=color)
 
     @property
     def color(self) -> str:
@@ -396,57 +850,502 @@ class Volume(Widget):
         self._color = value
         self._event.set()
 
+    async def _volume_up(self):
+        self._change_volume(0.01)
+
+    async def _volume_down(self):
+        self._change_volume(-0.01)
+
+    def _change_volume(self, delta: float):
+        if self._pulse is None:
+            return
+        self._delta += delta
+        self._traces.append(tracing.expect())
+        self._pending.set()
+
+    def _relevant(self, event: Any) -> bool:
+        if event.facility == "server":
+            return True
+        return (event.facility == "sink" and self._sink is not None
+                and event.index == self._sink.index)
+
+    async def _write(self, pulse: "pulsectl_asyncio.PulseAsync"):
+        from pulsectl import PulseError
+
+        while True:
+            await self._pending.wait()
+            self._pending.clear()
+            delta, self._delta = self._delta, 0.0
+            if round(delta, 6) == 0.0:
+                continue
+            try:
+                async with self._lock:
+                    await pulse.volume_change_all_chans(self._sink, delta)
+            except PulseError as e:
+                print(f"volume change failed: {e!r}", file=sys.stderr)
+
+    async def _resolve(self, pulse: "pulsectl_asyncio.PulseAsync",
+                       default: bool) -> Any:
+        from pulsectl import PulseIndexError
+
+        if not default:
+            try:
+                return await pulse.sink_info(self._sink.index)
+            except PulseIndexError:
+                pass
+        return await pulse.sink_default_get()
+
+    @staticmethod
+    def _moved(event: Any) -> bool:
+        if isinstance(event, Exception):
+            raise event
+        return event.facility == "server" or event.t == "remove"
+
+    async def _listen(self, pulse: "pulsectl_asyncio.PulseAsync",
+                      events: asyncio.Queue):
+        from pulsectl import PulseError
+
+        while True:
+            moved = self._moved(await events.get())
+            while not events.empty():
+                moved |= self._moved(events.get_nowait())
+            try:
+                async with self._lock:
+                    self._sink = await self._resolve(pulse, moved)
+            except PulseError as e:
+                print(f"volume refresh failed: {e!r}", file=sys.stderr)
+                continue
+            tracing.arrived(self._traces)
+            self._traces.clear()
+            self._event.set()
+
     async def __aiter__(self) -> AsyncIterator[str]:
-        tasks = set()
+        async with pool.connect() as pulse:
+            try:
+                self._sink = await pulse.sink_default_get()
+            except:
+                return
+
+            events = pool.subscribe(self._relevant)
+            self._pulse = pulse
+            self._event.set()
+            tasks = [asyncio.create_task(self._listen(pulse, events)),
+                     asyncio.create_task(self._write(pulse))]
+            for task in tasks:
+                task.add_done_callback(lambda _: self._event.set())
+            try:
+                while True:
+                    await self._event.wait()
+                    self._event.clear()
+                    for task in tasks:
+                        if task.done():
+                            task.result()
+                    yield self.cache(
+                        round(self._sink.volume.value_flat * 100.0),
+                        self._color)
+            finally:
+                self._pulse = None
+                pool.unsubscribe(events)
+                for task in tasks:
+                    task.cancel()
+
+
+def _human(rate: float) -> str:
+    for unit in ("B", "K", "M"):
+        if rate < 1000.0:
+            return f"{rate:.0f}{unit}"
+        rate /= 1024.0
+    return f"{rate:.1f}G"
+
+
+class Network(Widget):
+    def __init__(
+        self,
+        interface: Optional[str]=None,
+        rates: bool=False,
+        interval: float=1.0,
+        color: str="#c9a00e"
+    ):
+        self._interface: Optional[str] = interface
+        self._rates: bool = rates
+        self._interval: float = interval
+        self._color: str = color
+        self._event = asyncio.Event()
+        self._name: Optional[str] = None
+        self._address: Optional[str] = None
+        self._rx: Optional[float] = None
+        self._tx: Optional[float] = None
+        self._template = Template(
+            Box([FColor(Text(Slot("text")), Slot("color")), FColor()]))
+
+    def _render(self) -> str:
+        text = self._address or "down"
+        if self._rates and self._rx is not None:
+            text += f" ↓{_human(self._rx)} ↑{_human(self._tx)}"
+        return self._template.fill(text=text, color=self._color)
+
+    def _resolve(self) -> Optional[str]:
+        if self._interface is not None:
+            return self._interface
+        return netlink.default_interface()
+
+    def _update(self, name: Optional[str], address: Optional[str]):
+        if (name, address) == (self._name, self._address):
+            return
+        if name != self._name:
+            self._rx = self._tx = None
+        self._name, self._address = name, address
+        self._event.set()
+
+    async def _watch(self, link: netlink.Netlink):
+        async for _ in link.changes():
+            name = self._resolve()
+            self._update(name, link.address(name) if name else None)
+
+    async def _poll(self):
+        tick = asyncio.Event()
+        wheel.subscribe(self._interval, tick)
+        try:
+            while True:
+                await tick.wait()
+                tick.clear()
+                name = self._resolve()
+                self._update(name,
+                             netlink.read_address(name) if name else None)
+        finally:
+            wheel.unsubscribe(self._interval, tick)
+
+    async def _sample(self):
+        tick = asyncio.Event()
+        last, name = None, None
+        wheel.subscribe(self._interval, tick)
+        try:
+            while True:
+                now = time.monotonic()
+                sample = netlink.counters(self._name) if self._name else None
+                if (sample is not None and last is not None
+                        and name == self._name):
+                    elapsed = now - last[0]
+                    self._rx = (sample[0] - last[1][0]) / elapsed
+                    self._tx = (sample[1] - last[1][1]) / elapsed
+                    self._event.set()
+                last = (now, sample) if sample is not None else None
+                name = self._name
+                await tick.wait()
+                tick.clear()
+        finally:
+            wheel.unsubscribe(self._interval, tick)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        try:
+            link = netlink.Netlink()
+            await link.load()
+        except OSError:
+            link = None
+
+        name = self._resolve()
+        if link is not None:
+            self._update(name, link.address(name) if name else None)
+            tasks = [asyncio.create_task(self._watch(link))]
+        else:
+            self._update(name, netlink.read_address(name) if name else None)
+            tasks = [asyncio.create_task(self._poll())]
+        if self._rates:
+            tasks.append(asyncio.create_task(self._sample()))
+
+        last = None
+        try:
+            while True:
+                text = self._render()
+                if text != last:
+                    last = text
+                    yield text
+                await self._event.wait()
+                self._event.clear()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if link is not None:
+                link.close()
 
-        def volume_up():
-            coro = pulse.volume_change_all_chans(sink, 0.01)
-            tasks.add(asyncio.create_task(coro))
 
-        def volume_down():
-            coro = pulse.volume_change_all_chans(sink, -0.01)
-            tasks.add(asyncio.create_task(coro))
+class Stat(Widget):
+    icon: str = ''
+    kind: str = ''
 
-        def result():
-            volume = Box([
+    def __init__(
+        self,
+        period: float=1.0,
+        font_index: int=0,
+        color: str="#dddddd",
+        cache_size: int=32
+    ):
+        self._sampler = sysstat.sampler(self.kind, period)
+        self._template = Template(
+            Box([
                 FColor(
                     Box([
                         Box([
-                            Font(Text('\uf028'), str(self._font_index) if self._font_index > 0 else ''),
+                            Font(Text(self.icon),
+                                 str(font_index) if font_index > 0 else ''),
                             Font()
                         ]),
-                        Text(f"{round(sink.volume.value_flat * 100.0)}%")
-            ], ' '), self._color), FColor()])
+                        Text(Slot("value"))
+                    ], ' '), color),
+                FColor()]))
+        self.cache = RenderCache(self._render, cache_size)
+
+    def _render(self, value: str) -> str:
+        return self._template.fill(value=value)
 
-            pavu_button = volume
-            if self._spawn_pavu is not None:
-                pavu_button = Button(volume, self._spawn_pavu)
+    @abstractmethod
+    def _value(self, sample: Any, previous: Any) -> str:
+        pass
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        event = self._sampler.subscribe()
+        try:
+            last = None
+            while True:
+                value = self._value(self._sampler.value,
+                                    self._sampler.previous)
+                if value != last:
+                    last = value
+                    yield self.cache(value)
+                await event.wait()
+                event.clear()
+        finally:
+            self._sampler.unsubscribe(event)
 
-            volume_control = Button(
-                Button(pavu_button, volume_up, "4"), volume_down, "5")
 
-            return volume_control
+class CPU(Stat):
+    icon = '\uf2db'
+    kind = "cpu"
 
-        async def listen():
-            nonlocal sink
+    def _value(self, sample: tuple[int, int],
+               previous: Optional[tuple[int, int]]) -> str:
+        if previous is None or sample[1] == previous[1]:
+            return "--%"
+        busy = sample[0] - previous[0]
+        return f"{round(busy * 100 / (sample[1] - previous[1]))}%"
 
-            async for event in pulse.subscribe_events('sink'):
-                sink = await pulse.sink_default_get()
-                self._event.set()
 
+class Memory(Stat):
+    icon = '\uf538'
+    kind = "memory"
 
-        async with pulsectl_asyncio.PulseAsync("default-sink-volume") as pulse:
-            try:
-                sink = await pulse.sink_default_get()
-            except:
-                return
+    def _value(self, sample: tuple[int, int], previous: Any) -> str:
+        total, available = sample
+        return f"{round((total - available) * 100 / total)}%"
 
-            self._event.set()
-            task = asyncio.create_task(listen())
+
+class Load(Stat):
+    icon = '\uf0e4'
+    kind = "load"
+
+    def _value(self, sample: tuple[float, float, float],
+               previous: Any) -> str:
+        return f"{sample[0]:.2f}"
+
+
+class Thermal(Stat):
+    icon = '\uf2c9'
+
+    def __init__(
+        self,
+        zone: int=0,
+        period: float=1.0,
+        font_index: int=0,
+        color: str="#dddddd",
+        cache_size: int=32
+    ):
+        self.kind = f"thermal{zone}"
+        super().__init__(period, font_index, color, cache_size)
+
+    def _value(self, sample: float, previous: Any) -> str:
+        return f"{round(sample)}°C"
+
+
+class Tags(Widget):
+    colors: dict[str, str] = {
+        "#": "#ffffff",
+        "+": "#1693d2",
+        "%": "#1693d2",
+        "-": "#808080",
+        ":": "#aaaaaa",
+        ".": "#555555",
+        "!": "#ff0000",
+    }
+
+    def __init__(
+        self,
+        monitor: Optional[int]=None,
+        show_empty: bool=True,
+        client: herbstluft.Herbstclient=herbstluft.client
+    ):
+        self._monitor: Optional[int] = monitor
+        self._show_empty: bool = show_empty
+        self._client = client
+        self._templates: dict[str, Template] = {}
+
+    def _template(self, name: str) -> Template:
+        template = self._templates.get(name)
+        if template is None:
+            template = Template(Button(
+                Box([FColor(Text(f" {name} "), Slot("color")), FColor()]),
+                partial(self._client.command, "use", name)))
+            self._templates[name] = template
+        return template
+
+    def _render(self, tags: list[tuple[str, str]]) -> str:
+        names = {name for name, _ in tags}
+        for name in self._templates.keys() - names:
+            del self._templates[name]
+
+        return "".join(
+            self._template(name).fill(color=self.colors.get(state, ""))
+            for name, state in tags
+            if self._show_empty or state != ".")
+
+    async def _status(self) -> list[tuple[str, str]]:
+        args = ["tag_status"]
+        if self._monitor is not None:
+            args.append(str(self._monitor))
+        return herbstluft.parse_tags(await self._client.query(*args))
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        hooks = self._client.subscribe(
+            lambda hook: hook[0] in herbstluft.TAG_HOOKS)
+        try:
+            last = None
+            while True:
+                text = self._render(await self._status())
+                if text != last:
+                    last = text
+                    yield text
+                await hooks.get()
+                while not hooks.empty():
+                    hooks.get_nowait()
+        finally:
+            self._client.unsubscribe(hooks)
+
+
+class WindowTitle(Widget):
+    def __init__(
+        self,
+        maxlen: int=60,
+        client: herbstluft.Herbstclient=herbstluft.client
+    ):
+        self._maxlen: int = maxlen
+        self._client = client
+
+    async def _focus(self) -> tuple[Optional[str], str]:
+        winid, title = await asyncio.gather(
+            self._client.query("attr", "clients.focus.winid"),
+            self._client.query("attr", "clients.focus.title"))
+        return winid.strip() or None, title.removesuffix("\n")
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        hooks = self._client.subscribe(
+            lambda hook: hook[0] in herbstluft.WINDOW_HOOKS
+            or hook[0] == "reload")
+        try:
+            focused, title = await self._focus()
             while True:
+                if len(title) > self._maxlen:
+                    title = title[:self._maxlen - 1] + "…"
+                yield Text(title).static()
+
+                hook = await hooks.get()
+                while not (hook[0] in ("reload", "focus_changed")
+                           or len(hook) > 1 and hook[1] == focused):
+                    hook = await hooks.get()
+                if hook[0] == "reload":
+                    focused, title = await self._focus()
+                    continue
+                if hook[0] == "focus_changed":
+                    focused = hook[1] if len(hook) > 1 else None
+                title = hook[2] if len(hook) > 2 else ""
+        finally:
+            self._client.unsubscribe(hooks)
+
+
+class Threaded(Widget):
+    def __init__(
+        self,
+        producer: Callable[[], str],
+        period: float=5.0,
+        timeout: Optional[float]=1.0,
+        executor: Optional[Executor]=None
+    ):
+        self._call = workers.Call(producer, executor or workers.executor)
+        self._period: float = period
+        self._timeout: Optional[float] = timeout
+        self._event = asyncio.Event()
+
+    async def refresh(self):
+        self._event.set()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        wheel.subscribe(self._period, self._event)
+        try:
+            last = None
+            while True:
+                value = await self._call.poll(self._timeout, self._event)
+                if value is None:
+                    value = ""
+                if value != last:
+                    last = value
+                    yield Text(value).static()
                 await self._event.wait()
-                yield await anext(aiter(result()))
                 self._event.clear()
-                await asyncio.gather(*tasks)
-                tasks.clear()
-            await task
+        finally:
+            wheel.unsubscribe(self._period, self._event)
+            self._call.cancel()
+
+
+class Worker(Widget):
+    def __init__(
+        self,
+        target: str,
+        period: float=5.0,
+        restart_delay: float=1.0,
+        max_restart_delay: float=60.0
+    ):
+        self._target: str = target
+        self._period: float = period
+        self._restart_delay: float = restart_delay
+        self._max_restart_delay: float = max_restart_delay
+        self.restarts: int = 0
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        delay = self._restart_delay
+        last = None
+        while True:
+            started = time.monotonic()
+            process: Optional[asyncio.subprocess.Process] = None
+            error: Optional[Exception] = None
+            try:
+                process = await workers.spawn(self._target, self._period)
+                async for value in workers.frames(process):
+                    if value != last:
+                        last = value
+                        yield Text(value).static()
+            except (OSError, ValueError) as e:
+                error = e
+            finally:
+                if process is not None:
+                    await workers.stop(process)
+
+            if last is None:
+                last = ""
+                yield last
+            if time.monotonic() - started > self._max_restart_delay:
+                delay = self._restart_delay
+            self.restarts += 1
+            reason = (f"failed with {error!r}" if error is not None
+                      else f"exited with {process.returncode}")
+            print(f"worker {self._target} {reason}, "
+                  f"restarting in {delay:g}s", file=sys.stderr)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_restart_delay)
@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import struct
+import asyncio
+import inspect
+import importlib
+import threading
+
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Optional
+
+executor = ThreadPoolExecutor(4, thread_name_prefix="pybar-producer")
+
+FRAME = struct.Struct("!I")
+MAX_FRAME = 1 << 20
+SHUTDOWN_TIMEOUT = 1.0
+
+
+class Call:
+    def __init__(
+        self,
+        producer: Callable[[], str],
+        executor: Executor=executor
+    ):
+        self.value: Optional[str] = None
+        self.calls: int = 0
+        self.timeouts: int = 0
+        self.errors: int = 0
+        self._producer = producer
+        self._executor = executor
+        self._future: Optional[asyncio.Future] = None
+
+    async def poll(
+        self,
+        timeout: Optional[float]=None,
+        late: Optional[asyncio.Event]=None
+    ) -> Optional[str]:
+        if self._future is None:
+            loop = asyncio.get_running_loop()
+            self._future = loop.run_in_executor(self._executor,
+                                                self._producer)
+            self.calls += 1
+
+        future = self._future
+        try:
+            self.value = await asyncio.wait_for(asyncio.shield(future),
+                                                timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            if late is not None:
+                future.add_done_callback(lambda _: late.set())
+            return self.value
+        except Exception as e:
+            self.errors += 1
+            print(f"producer {self._producer!r} failed: {e!r}",
+                  file=sys.stderr)
+        self._future = None
+        return self.value
+
+    def cancel(self):
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+async def spawn(target: str, period: float) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__), target, str(period),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+
+
+async def frames(process: asyncio.subprocess.Process) -> AsyncIterator[str]:
+    while True:
+        try:
+            header = await process.stdout.readexactly(FRAME.size)
+            length, = FRAME.unpack(header)
+            if length > MAX_FRAME:
+                raise ValueError(f"frame of {length} bytes")
+            data = await process.stdout.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return
+        yield data.decode(errors="replace")
+
+
+async def stop(process: asyncio.subprocess.Process):
+    if process.returncode is None:
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), SHUTDOWN_TIMEOUT)
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+
+
+def _orphaned():
+    while os.read(sys.stdin.fileno(), 4096):
+        pass
+    os._exit(0)
+
+
+def _poll(producer: Callable[[], str], period: float) -> Iterator[str]:
+    while True:
+        yield producer()
+        time.sleep(period)
+
+
+def serve(target: str, period: float) -> int:
+    module, _, name = target.partition(":")
+    producer = getattr(importlib.import_module(module), name)
+    threading.Thread(target=_orphaned, daemon=True).start()
+
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    if inspect.isgeneratorfunction(producer):
+        values = producer()
+    else:
+        values = _poll(producer, period)
+
+    last = None
+    try:
+        for value in values:
+            if value == last:
+                continue
+            last = value
+            data = value.encode()
+            out.write(FRAME.pack(len(data)) + data)
+            out.flush()
+    except BrokenPipeError:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(serve(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2
+                   else 5.0))